@@ -1,2 +1,13 @@
-from bitcalc import bits
-from bitcalc import interface
+""" Bitcalc - conversion and comparison of bit/byte values
+
+Submodules are imported on first attribute access to keep start up fast.
+"""
+__all__ = ['bits', 'interface']
+
+
+def __getattr__(name):
+    if name in __all__:
+        from importlib import import_module
+        return import_module('.{0}'.format(name), __name__)
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
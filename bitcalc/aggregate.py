@@ -0,0 +1,236 @@
+""" Streaming aggregation of mixed-unit sizes
+
+Values in any bitcalc label are normalized to bits in a single pass and
+folded into per-group running statistics (count, sum, min, max) plus a
+mergeable quantile sketch, so memory per group stays constant regardless of
+how many values are added.
+"""
+import math
+from .bits import DataUnit, label_to_bits_factor
+from .parsing import parse_quantity
+
+
+class QuantileSketch:
+    """ Mergeable relative-error quantile sketch over positive values
+
+    Values are counted in logarithmically sized buckets, so any quantile
+    estimate is within relative_accuracy of a true value. When more than
+    max_buckets are in use the lowest buckets are collapsed together, which
+    keeps memory bounded while preserving accuracy of upper quantiles.
+    """
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, weight=1):
+        """ Add value (counted weight times) to the sketch """
+        self.count += weight
+        if value <= 0:
+            self.zero_count += weight
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + weight
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other):
+        """ Fold another sketch with the same relative_accuracy into this one
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches of different accuracy')
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        folded = sum(self.buckets.pop(key) for key in excess)
+        target = keys[len(excess)]
+        self.buckets[target] += folded
+
+    def quantile(self, q):
+        """ Estimate the value at quantile q (0 <= q <= 1)
+
+        Quantiles use the nearest-rank definition: the estimate is of the
+        smallest value with at least q * count values at or below it (the
+        ceil(q * count)-th smallest, or the smallest for q = 0).
+
+        Output: Float estimate, or None when the sketch is empty
+        """
+        if not self.count:
+            return None
+        # Round away float noise such as 0.07 * 100 = 7.000000000000001
+        rank = max(1, math.ceil(round(q * self.count, 9)))
+        seen = self.zero_count
+        if rank <= seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class SizeStats:
+    """ Running statistics of sizes, tracked in bits """
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.sketch = QuantileSketch(relative_accuracy, max_buckets)
+
+    def add(self, bits):
+        self.count += 1
+        self.total += bits
+        if self.minimum is None or bits < self.minimum:
+            self.minimum = bits
+        if self.maximum is None or bits > self.maximum:
+            self.maximum = bits
+        self.sketch.add(bits)
+
+    def merge(self, other):
+        """ Fold another SizeStats object into this one """
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+        self.sketch.merge(other.sketch)
+
+    def percentile(self, p):
+        """ Estimate the size in bits at percentile p (0-100) """
+        estimate = self.sketch.quantile(p / 100)
+        if estimate is None:
+            return None
+        # Bucket midpoints may fall outside the exactly tracked range
+        return min(max(estimate, self.minimum), self.maximum)
+
+
+def split_size(size):
+    """ Split a size string into value and short label
+
+    Input:
+        - size: String formatted as "value label" or "valuelabel"
+                (e.g.: '3.2 TiB', '800GB')
+
+    Output: Tuple of (float value, label string)
+    """
+    return parse_quantity(size)
+
+
+class Aggregator:
+    """ Group keyed streaming aggregation of mixed-unit sizes """
+    percentiles = (50, 90, 99)
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, base=None):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.base = base
+        self.groups = {}
+        self._factors = {}
+
+    def _stats(self, group):
+        stats = self.groups.get(group)
+        if stats is None:
+            stats = SizeStats(self.relative_accuracy, self.max_buckets)
+            self.groups[group] = stats
+        return stats
+
+    def add(self, value, label_short=None, group=None):
+        """ Add a size to group
+
+        Input:
+            - value: Numeric value at label_short, or a size string such as
+                     '3.2 TiB' when label_short is omitted
+            - label_short: Short unit label of value
+            - group: Hashable group key (e.g.: host name)
+        """
+        if label_short is None:
+            value, label_short = split_size(value)
+        factor = self._factors.get(label_short)
+        if factor is None:
+            factor = label_to_bits_factor(label_short, base=self.base)
+            self._factors[label_short] = factor
+        self._stats(group).add(value * factor)
+
+    def add_many(self, records):
+        """ Add many sizes in a single pass
+
+        Input:
+            - records: Iterable of (group, value, label_short) or
+                       (group, size_string) tuples
+        """
+        for record in records:
+            if len(record) == 2:
+                self.add(record[1], group=record[0])
+            else:
+                self.add(record[1], record[2], group=record[0])
+
+    def merge(self, other):
+        """ Fold another Aggregator's groups into this one """
+        for group, stats in other.groups.items():
+            self._stats(group).merge(stats)
+
+    def summary(self, group=None):
+        """ Summarize a group's statistics in bits
+
+        Output: List of (statistic name, bits) tuples
+        """
+        stats = self.groups[group]
+        rows = [
+            ('Count', stats.count),
+            ('Sum', stats.total),
+            ('Min', stats.minimum),
+            ('Max', stats.maximum),
+            ('Mean', stats.total / stats.count),
+        ]
+        for p in self.percentiles:
+            rows.append(('P{}'.format(p), stats.percentile(p)))
+        return rows
+
+    def report(self, target_label, group=None):
+        """ Express a group's statistics as DataUnit objects at target_label
+
+        Input:
+            - target_label: Short unit label to report values in
+            - group: Group key to report
+
+        Output: Tuple of (row label list, DataUnit list); the Count row is
+                omitted as it has no unit
+        """
+        row_labels = []
+        units = []
+        for name, bits in self.summary(group)[1:]:
+            row_labels.append(name)
+            units.append(DataUnit.from_bits(bits, target_label))
+        return row_labels, units
+
+    def format_report(self, target_label):
+        """ Format every group's statistics as tables at target_label
+
+        Output: String containing one table per group
+        """
+        from .interface import format_table
+        content = []
+        for group in self.groups:
+            row_labels, units = self.report(target_label, group)
+            content.append('\nGroup: {g} ({c} values)\n{t}'.format(
+                g=group,
+                c=self.groups[group].count,
+                t=format_table(units, row_labels=row_labels)))
+        return ''.join(content)
@@ -0,0 +1,516 @@
+""" Benchmarks for bitcalc conversion, parsing, formatting and start up
+
+Run with: python -m bitcalc.bench [--output FILE] [--baseline FILE]
+
+Every benchmark reports the best average seconds per operation over several
+timing runs on fixed, seeded inputs. Results are emitted as JSON and may be
+compared against a stored baseline; any benchmark slower than the baseline
+by more than the threshold is reported as a regression (exit status 1).
+"""
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import timeit
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from .bits import DataUnit, ExactDataUnit
+from .interface import (LABELS_B2, LABELS_B10, new_parser, main as cli_main,
+                        format_table, generate_data_unit_list)
+from .time import Duration
+
+# Registered benchmark name to (function, kind)
+BENCHMARKS = OrderedDict()
+
+# Cumulative import time budget for bitcalc.interface (microseconds)
+STARTUP_IMPORT_BUDGET_US = 20000
+
+# Snippet executed for command line cold start measurements
+STARTUP_SNIPPET = (
+    "from bitcalc.interface import main; main(['5', 'GiB', 'MiB'])")
+
+# Default allowed slowdown relative to baseline before flagging regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def benchmark(name, kind='micro'):
+    """ Register decorated function as a benchmark
+
+    The decorated function takes no arguments and returns seconds per
+    operation.
+
+    Input:
+        - name: Unique benchmark name used in JSON output and baselines
+        - kind: Benchmark category (micro, macro, scaling or startup)
+    """
+    def register(func):
+        BENCHMARKS[name] = (func, kind)
+        return func
+    return register
+
+
+def time_call(func, number=1, repeat=5):
+    """ Time func, returning the best average seconds per call
+
+    Input:
+        - func: Callable taking no arguments
+        - number: Calls per timing run
+        - repeat: Timing runs; the fastest is kept to reduce noise
+
+    Output: Float seconds per call
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def sample_values(count, seed=0):
+    """ Generate reproducible petabyte scale byte counts
+
+    Input:
+        - count: Number of values to generate
+        - seed: Random seed
+
+    Output: List of ints
+    """
+    rng = random.Random(seed)
+    return [rng.randrange(2**40, 2**60) for _ in range(count)]
+
+
+def sample_timestamps(count, seed=0):
+    """ Generate reproducible y:w:d:h:m:s timestamps of varying length
+
+    Input:
+        - count: Number of timestamps to generate
+        - seed: Random seed
+
+    Output: List of timestamp strings
+    """
+    rng = random.Random(seed)
+    limits = [60, 60, 24, 7, 52, 10]
+    timestamps = []
+    for _ in range(count):
+        fields = [rng.randrange(limit) for limit in limits[:rng.randint(1, 6)]]
+        timestamps.append(':'.join(str(f) for f in reversed(fields)))
+    return timestamps
+
+
+def sample_quantities(count, seed=0):
+    """ Generate reproducible size strings such as '940.27 Kib' or '366.6KiB'
+
+    Input:
+        - count: Number of strings to generate
+        - seed: Random seed
+
+    Output: List of strings
+    """
+    rng = random.Random(seed)
+    labels = LABELS_B2 + LABELS_B10
+    return ['{v}{s}{l}'.format(
+        v=round(rng.uniform(0, 1024), rng.randint(0, 3)),
+        s=' ' * rng.randint(0, 1),
+        l=labels[i % len(labels)]) for i in range(count)]
+
+
+@benchmark('data_unit_init')
+def bench_data_unit_init(count=10000):
+    values = sample_values(count)
+    labels = LABELS_B2 + LABELS_B10
+    pairs = [(v, labels[i % len(labels)]) for i, v in enumerate(values)]
+
+    def run():
+        for value, label in pairs:
+            DataUnit(value, label)
+    return time_call(run) / count
+
+
+@benchmark('generate_data_unit_list')
+def bench_float_conversion(count=1000):
+    labels = LABELS_B2 + LABELS_B10
+    units = [DataUnit(value, 'B') for value in sample_values(count)]
+
+    def run():
+        for unit in units:
+            generate_data_unit_list(unit, labels)
+    return time_call(run) / count
+
+
+@benchmark('generate_data_unit_list_exact')
+def bench_exact_conversion(count=1000):
+    labels = LABELS_B2 + LABELS_B10
+    units = [ExactDataUnit(value, 'B') for value in sample_values(count)]
+
+    def run():
+        for unit in units:
+            generate_data_unit_list(unit, labels)
+    return time_call(run) / count
+
+
+@benchmark('timestamp_to_seconds')
+def bench_timestamp_to_seconds(count=10000):
+    timestamps = sample_timestamps(count)
+
+    def run():
+        for timestamp in timestamps:
+            Duration.timestamp_to_seconds(timestamp)
+    return time_call(run) / count
+
+
+@benchmark('timestamps_to_seconds')
+def bench_timestamps_to_seconds(count=10000):
+    timestamps = sample_timestamps(count)
+    return time_call(
+        lambda: Duration.timestamps_to_seconds(timestamps)) / count
+
+
+@benchmark('duration_from_seconds')
+def bench_duration_from_seconds(count=10000):
+    seconds = [value % 10**8 for value in sample_values(count)]
+
+    def run():
+        for value in seconds:
+            Duration.from_seconds(value)
+    return time_call(run) / count
+
+
+@benchmark('parse_quantity')
+def bench_parse_quantity(count=10000):
+    from .parsing import parse_quantity
+    texts = sample_quantities(count)
+
+    def run():
+        for text in texts:
+            parse_quantity(text)
+    return time_call(run) / count
+
+
+@benchmark('parse_quantities')
+def bench_parse_quantities(count=100000):
+    from .parsing import parse_quantities
+    texts = sample_quantities(count)
+    return time_call(lambda: parse_quantities(texts)) / count
+
+
+@benchmark('humanize')
+def bench_humanize(count=100000):
+    from .humanize import humanize
+    values = sample_values(count)
+    return time_call(lambda: humanize(values)) / count
+
+
+@benchmark('tier_summarize')
+def bench_tier_summarize(count=100000):
+    from .tiers import TierIndex
+    index = TierIndex.from_string('<512 MiB hot, <2 TB warm, else cold')
+    values = sample_values(count)
+    return time_call(lambda: index.summarize(values)) / count
+
+
+@benchmark('schedule')
+def bench_schedule(count=100000):
+    from .schedule import Simulation
+    rng = random.Random(0)
+    simulation = Simulation()
+    simulation.add_link('wan', '10 Gbps')
+    simulation.add_link('lan', '40 Gbps')
+    simulation.add_jobs(
+        sample_values(count), 'B',
+        [rng.choice(('wan', 'lan')) for _ in range(count)],
+        weight=[rng.choice((1, 2, 4)) for _ in range(count)],
+        priority=[rng.choice((0, 1)) for _ in range(count)],
+        release=[rng.uniform(0, 3600) for _ in range(count)])
+    return time_call(simulation.run) / count
+
+
+@benchmark('layout_grid')
+def bench_layout_grid(count=100000):
+    from .layout import LayoutGrid
+    schemes = ('raid5', 'raid6', 'raid6:12', 'raid10', '8+3', '4+2', '10+4',
+               '16+4')
+    reserves = (0, 0.02, 0.05, 0.1, 0.2)
+    sizes = range(1, count // (len(schemes) * len(reserves) * 100) + 1)
+    rows = len(schemes) * len(sizes) * 100 * len(reserves)
+    return time_call(lambda: LayoutGrid(
+        sizes, range(1, 101), schemes, reserves).sort()) / rows
+
+
+@benchmark('format_table')
+def bench_format_table(count=200):
+    units = [
+        generate_data_unit_list(DataUnit(value, 'B'), LABELS_B2)
+        for value in sample_values(count)]
+
+    def run():
+        for unit_list in units:
+            format_table(unit_list)
+    return time_call(run) / count
+
+
+@benchmark('format_table_combo')
+def bench_format_table_combo(count=200):
+    pairs = []
+    for value in sample_values(count):
+        unit = DataUnit(value, 'B')
+        pairs.append((
+            generate_data_unit_list(unit, LABELS_B2),
+            generate_data_unit_list(unit, LABELS_B10)))
+
+    def run():
+        for b2_units, b10_units in pairs:
+            format_table(b2_units, b10_units)
+    return time_call(run) / count
+
+
+@benchmark('cli_alt_table', kind='macro')
+def bench_cli_alt_table(count=200):
+    argv = ['5', 'GiB', '--alt']
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            for _ in range(count):
+                cli_main(argv)
+    return time_call(run) / count
+
+
+@benchmark('cli_stream', kind='macro')
+def bench_cli_stream(count=10000):
+    from .stream import convert_stream
+    labels = LABELS_B2 + LABELS_B10
+    lines = ['{} {}\n'.format(v, labels[i % len(labels)])
+             for i, v in enumerate(sample_values(count))]
+
+    def run():
+        convert_stream(lines, io.StringIO(), ['MiB', 'GB'])
+    return time_call(run) / count
+
+
+# Worker process counts measured by the stream_jobs_N scaling benchmarks
+STREAM_JOBS = (1, 2, 4, 8)
+
+
+def bench_stream_jobs(jobs, count=200000):
+    """ Time process pool stream conversion with jobs workers
+
+    Pool start up is included, so small inputs favour fewer workers.
+
+    Output: Float seconds per record
+    """
+    from .stream import convert_stream_parallel
+    labels = LABELS_B2 + LABELS_B10
+    lines = ['{} {}\n'.format(v, labels[i % len(labels)])
+             for i, v in enumerate(sample_values(count))]
+
+    def run():
+        convert_stream_parallel(
+            lines, io.StringIO(), ['MiB', 'GB'], jobs=jobs)
+    return time_call(run, repeat=3) / count
+
+
+for _jobs in STREAM_JOBS:
+    benchmark('stream_jobs_{}'.format(_jobs), kind='scaling')(
+        lambda jobs=_jobs: bench_stream_jobs(jobs))
+del _jobs
+
+
+def measure_import_time(module='bitcalc.interface', repeat=5):
+    """ Measure cumulative import time of module with -X importtime
+
+    Input:
+        - module: Dotted module name to import in a fresh interpreter
+        - repeat: Number of fresh interpreters; the fastest is kept
+
+    Output: Integer microseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+            universal_newlines=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                timings.append(int(fields[1]))
+    return min(timings)
+
+
+def measure_cold_start(snippet=STARTUP_SNIPPET, repeat=5):
+    """ Measure wall clock time of a fresh interpreter running snippet
+
+    The cost of starting a bare interpreter is subtracted, leaving the time
+    attributable to bitcalc.
+
+    Input:
+        - snippet: Python source to execute
+        - repeat: Number of fresh interpreters; the fastest is kept
+
+    Output: Float seconds
+    """
+    def run(source):
+        return lambda: subprocess.run(
+            [sys.executable, '-c', source],
+            stdout=subprocess.DEVNULL, check=True)
+    bare = time_call(run('pass'), repeat=repeat)
+    return max(time_call(run(snippet), repeat=repeat) - bare, 0.0)
+
+
+@benchmark('import_time', kind='startup')
+def bench_import_time():
+    return measure_import_time() / 10**6
+
+
+@benchmark('cold_start', kind='startup')
+def bench_cold_start():
+    return measure_cold_start()
+
+
+def run_benchmarks(names=None, kinds=None):
+    """ Run registered benchmarks
+
+    Input:
+        - names: Optional iterable of benchmark names to run
+        - kinds: Optional iterable of benchmark kinds to run
+
+    Output: Dictionary of results suitable for JSON serialization
+    """
+    results = OrderedDict()
+    for name, (func, kind) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        if kinds and kind not in kinds:
+            continue
+        seconds = func()
+        results[name] = {
+            'kind': kind,
+            'seconds_per_op': seconds,
+            'ops_per_second': 1 / seconds if seconds else None,
+        }
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'benchmarks': results,
+    }
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ Compare benchmark results against a baseline
+
+    Input:
+        - results: Output of run_benchmarks
+        - baseline: Output of run_benchmarks from a reference run
+        - threshold: Allowed fractional slowdown (e.g.: 0.10 for 10%)
+
+    Output: List of (name, baseline seconds, current seconds, change) tuples
+            for benchmarks that regressed beyond threshold
+    """
+    regressions = []
+    for name, current in results['benchmarks'].items():
+        reference = baseline['benchmarks'].get(name)
+        if not reference or not reference['seconds_per_op']:
+            continue
+        change = current['seconds_per_op'] / reference['seconds_per_op'] - 1
+        if change > threshold:
+            regressions.append((
+                name, reference['seconds_per_op'],
+                current['seconds_per_op'], change))
+    return regressions
+
+
+def format_results(results):
+    """ Format benchmark results as human readable lines
+
+    Input:
+        - results: Output of run_benchmarks
+
+    Output: String containing one line per benchmark
+    """
+    lines = []
+    for name, result in results['benchmarks'].items():
+        lines.append('{n: <32} {k: <8} {s: >12.3f} us/op\n'.format(
+            n=name, k=result['kind'], s=result['seconds_per_op'] * 10**6))
+    return ''.join(lines)
+
+
+def parse_args(argv=None):
+    """ Parse benchmark arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing argument values
+    """
+    desc = 'Bitcalc benchmarks - time conversion, parsing, formatting and '
+    desc += 'start up paths'
+    parser = new_parser(prog='python -m bitcalc.bench', description=desc)
+
+    # Argument: names (positional, optional, multiple allowed)
+    help_str = 'benchmark name(s) to run (default: all)'
+    help_str += '\n available: [{}]'.format('|'.join(BENCHMARKS))
+    parser.add_argument('names', help=help_str, nargs='*')
+
+    # Argument: -k --kind (optional, multiple allowed)
+    help_str = 'run only benchmarks of this kind'
+    parser.add_argument(
+        '-k', '--kind', help=help_str, action='append',
+        choices=['micro', 'macro', 'scaling', 'startup'])
+
+    # Argument: -o --output (optional)
+    help_str = 'write JSON results to file (use - for stdout)'
+    parser.add_argument('-o', '--output', help=help_str)
+
+    # Argument: --baseline (optional)
+    help_str = 'compare results against baseline JSON file'
+    parser.add_argument('--baseline', help=help_str)
+
+    # Argument: -t --threshold (optional)
+    help_str = 'allowed slowdown against baseline (default: {})'.format(
+        DEFAULT_THRESHOLD)
+    parser.add_argument(
+        '-t', '--threshold', help=help_str, type=float,
+        default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {}'.format(name))
+    return args
+
+
+def main(argv=None):
+    """ Entry point for benchmark invocation """
+    args = parse_args(argv)
+    results = run_benchmarks(args.names, args.kind)
+
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        sys.stdout.write(format_results(results))
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+
+    status = 0
+    import_time = results['benchmarks'].get('import_time')
+    if import_time and (import_time['seconds_per_op'] * 10**6
+                        > STARTUP_IMPORT_BUDGET_US):
+        sys.stderr.write('error: start up import budget ({} us) exceeded\n'
+                         .format(STARTUP_IMPORT_BUDGET_US))
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            sys.stderr.write(
+                'regression: {n} {b:0.3f} -> {a:0.3f} us/op (+{c:0.1%})\n'
+                .format(n=name, b=before * 10**6, a=after * 10**6, c=change))
+        if regressions:
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
-from datetime import timedelta
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from .compat import get_numpy
 from .time import Duration, scale_rate_to_seconds, SHORT_TO_LONG_TIME_LABELS
 
 # Label mappings
@@ -52,31 +54,45 @@ class DataUnit:
     k_divisor = int()
 
     def __init__(self, value, label_short, base=None):
-        self.base = self.label_to_base(label_short, base=base)
+        info = LABEL_TABLE[label_index(label_short, base=base)]
+        self.base = info.base
         self.value = value
-        self.label = DATA_LABEL_MAP[self.base][label_short]
+        self.label = info.label
         self.label_short = label_short
-        self.k_divisor = self.base_to_k_divisor(self.base)
-        self.prefix = self._get_prefix(self.label)
-        self.suffix = self._get_suffix(self.label)
-        self.is_bit = self.is_bit(self.label_short)
-        self.bits = self._reduce_to_bits()
+        self.k_divisor = info.k_divisor
+        self.prefix = info.prefix
+        self.suffix = info.suffix
+        self.is_bit = info.is_bit
+        self.bits = self._reduce_to_bits(info)
         self.bytes = self.bits_to_bytes(self.bits)
 
-    def _reduce_to_bits(self):
-        if self.prefix is None and self.is_bit:
+    def copy(self):
+        """ Copy this unit without deriving its label metadata again """
+        unit = object.__new__(self.__class__)
+        unit.__dict__.update(self.__dict__)
+        return unit
+
+    __copy__ = copy
+
+    def _reduce_to_bits(self, info):
+        if info.bits == 1:
             # Value is bits already
             return self.value
-        elif self.prefix is None and not self.is_bit:
-            # Value is bytes, convert to bits and return
-            return DataUnit.bytes_to_bits(self.value)
-        elif not self.is_bit:
-            # Value is bytes, but not plain; convert to bits for processing
-            value = DataUnit.bytes_to_bits(self.value)
-        else:
-            # value is bits, but not plain; save for processing
-            value = self.value
-        return DataUnit.prefix_to_value(value, self.prefix, self.k_divisor)
+        return self.value * info.bits
+
+    @classmethod
+    def from_bits(cls, bits, label_short, base=None):
+        """ Instantiate unit at label_short from a count of bits
+
+        Input:
+            - bits: Number of bits represented by the new unit
+            - label_short: Short unit label of the new unit
+            - base: Optional base for ambiguous labels (b/B)
+
+        Output: New unit instance
+        """
+        info = LABEL_TABLE[label_index(label_short, base=base)]
+        return cls(bits / info.bits, label_short, base=base)
 
     @staticmethod
     def _get_prefix(label):
@@ -130,6 +146,131 @@ class DataUnit:
         return 2**10 if base == 'base-2' else 10**3
 
 
+# Immutable label metadata, built once at import
+LabelInfo = namedtuple('LabelInfo', [
+    'label_short', 'label', 'base', 'k_divisor', 'prefix', 'suffix', 'is_bit',
+    'bits'])
+
+
+def _build_label_table():
+    """ Build tuple of LabelInfo entries for every (base, label) pair
+
+    Output: Tuple of LabelInfo objects, base-2 labels first
+    """
+    table = []
+    for base, labels in DATA_LABEL_MAP.items():
+        k_divisor = DataUnit.base_to_k_divisor(base)
+        for label_short, label in labels.items():
+            prefix = DataUnit._get_prefix(label)
+            is_bit = DataUnit.is_bit(label_short)
+            bits = 1 if is_bit else 8
+            if prefix is not None:
+                bits *= pow(k_divisor, PREFIX_TO_POWER[prefix[0]])
+            table.append(LabelInfo(
+                label_short, label, base, k_divisor, prefix,
+                DataUnit._get_suffix(label), is_bit, bits))
+    return tuple(table)
+
+
+LABEL_TABLE = _build_label_table()
+
+# Short label to LABEL_TABLE index; ambiguous labels (b/B) resolve to base-2
+LABEL_INDEX = MappingProxyType({
+    info.label_short: idx
+    for idx, info in enumerate(LABEL_TABLE)
+    if info.prefix is not None or info.base == 'base-2'})
+
+# (base, short label) to LABEL_TABLE index for explicitly based b/B labels
+_BASED_LABEL_INDEX = MappingProxyType({
+    (base, info.label_short): idx
+    for idx, info in enumerate(LABEL_TABLE)
+    if info.prefix is None
+    for base in (info.base, int(info.base[5:]))})
+
+# Multiplier converting a value at LABEL_TABLE[i] to LABEL_TABLE[j]
+CONVERSION_TABLE = tuple(
+    tuple(src.bits / dst.bits for dst in LABEL_TABLE) for src in LABEL_TABLE)
+
+
+def label_index(label_short, base=None):
+    """ Identify LABEL_TABLE index of label_short
+
+    Input:
+        - label_short: Short unit label (e.g.: 'GiB')
+        - base: Optional base for ambiguous labels (2, 10, 'base-2', 'base-10')
+
+    Output: Integer index into LABEL_TABLE
+    """
+    try:
+        if base:
+            return _BASED_LABEL_INDEX.get(
+                (base, label_short), LABEL_INDEX[label_short])
+        return LABEL_INDEX[label_short]
+    except KeyError:
+        raise ValueError('Invalid label: {0}'.format(label_short)) from None
+
+
+class CompactDataUnit:
+    """ Lightweight data unit holding only a value and a LABEL_TABLE index """
+    __slots__ = ('value', 'index')
+
+    def __init__(self, value, label_short, base=None):
+        self.value = value
+        self.index = label_index(label_short, base=base)
+
+    @classmethod
+    def from_index(cls, value, index):
+        unit = cls.__new__(cls)
+        unit.value = value
+        unit.index = index
+        return unit
+
+    def __repr__(self):
+        return '{0}({1!r}, {2!r}, base={3!r})'.format(
+            type(self).__name__, self.value, self.label_short, self.base)
+
+    @property
+    def info(self):
+        return LABEL_TABLE[self.index]
+
+    @property
+    def label_short(self):
+        return LABEL_TABLE[self.index].label_short
+
+    @property
+    def label(self):
+        return LABEL_TABLE[self.index].label
+
+    @property
+    def base(self):
+        return LABEL_TABLE[self.index].base
+
+    @property
+    def bits(self):
+        return self.value * LABEL_TABLE[self.index].bits
+
+    @property
+    def bytes(self):
+        return self.bits / 8
+
+    def to(self, label_short, base=None):
+        """ Convert to another short label
+
+        Input:
+            - label_short: Target short unit label
+            - base: Optional base for ambiguous target labels (b/B)
+
+        Output: New CompactDataUnit representing the same quantity
+        """
+        index = label_index(label_short, base=base)
+        return CompactDataUnit.from_index(
+            self.value * CONVERSION_TABLE[self.index][index], index)
+
+    def to_data_unit(self):
+        """ Expand into a full DataUnit object """
+        return DataUnit(self.value, self.label_short, base=self.base)
+
+
 class DataRate(DataUnit):
     """ Representation of data rate """
     def __init__(self, unit, rate=None, timestamp=None, time_label_short='s'):
@@ -141,8 +282,256 @@ class DataRate(DataUnit):
                 rate,
                 self.time_label_short)
             seconds = self.value / rate_seconds
+            from datetime import timedelta
             delta = timedelta(seconds=seconds)
             self.duration = Duration(delta=delta)
+            # Keep the given rate; the duration is rounded to whole seconds
+            self.rate = rate
         elif timestamp:
             self.duration = Duration(timestamp=timestamp)
-        self.rate = self.value / getattr(self.duration, self.time_label)
+            self.rate = self.value / getattr(self.duration, self.time_label)
+
+    @classmethod
+    def from_rate(cls, unit, rate, seconds, time_label_short='s'):
+        """ Instantiate from a known rate and duration, deriving neither
+
+        Use for rates the constructor cannot derive a duration from (e.g.:
+        zero rates or zero sizes).
+
+        Input:
+            - unit: DataUnit object moved
+            - rate: Rate at unit's label per time_label_short
+            - seconds: Duration in seconds (int or float)
+            - time_label_short: Short time label of rate
+
+        Output: New DataRate object
+        """
+        data_rate = cls(unit, time_label_short=time_label_short)
+        data_rate.rate = rate
+        data_rate.duration = Duration.from_seconds(seconds)
+        return data_rate
+
+
+def to_exact(value):
+    """ Convert value to an exact int or Fraction
+
+    Input:
+        - value: int, float, Decimal, Fraction or numeric string
+
+    Output: int when value is integral, otherwise Fraction
+    """
+    if isinstance(value, int):
+        return value
+    from fractions import Fraction
+    value = Fraction(value)
+    return value.numerator if value.denominator == 1 else value
+
+
+class ExactDataUnit(DataUnit):
+    """ Data unit using exact int/Fraction arithmetic
+
+    Values are never converted to float, so bit and byte counts of any size
+    stay exact; rounding only happens when values are formatted for output.
+    """
+    def __init__(self, value, label_short, base=None):
+        super().__init__(to_exact(value), label_short, base=base)
+
+    def _reduce_to_bits(self, info):
+        return self.value * info.bits
+
+    @classmethod
+    def from_bits(cls, bits, label_short, base=None):
+        from fractions import Fraction
+        info = LABEL_TABLE[label_index(label_short, base=base)]
+        return cls(Fraction(bits, info.bits), label_short, base=base)
+
+    @staticmethod
+    def value_to_prefix(value, prefix, k_divisor):
+        from fractions import Fraction
+        return to_exact(
+            Fraction(value, pow(k_divisor, PREFIX_TO_POWER[prefix[0]])))
+
+    @staticmethod
+    def bits_to_bytes(value):
+        from fractions import Fraction
+        return to_exact(Fraction(value, 8))
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """ Bounded least recently used cache with hit/miss statistics """
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            # Evict least recently used entry
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+# Opt-in conversion cache; None when disabled
+_conversion_cache = None
+
+
+def enable_cache(maxsize=1024):
+    """ Enable (or resize) the conversion cache
+
+    Input:
+        - maxsize: Maximum number of cached entries before LRU eviction
+
+    Output: The active LRUCache object
+    """
+    global _conversion_cache
+    _conversion_cache = LRUCache(maxsize)
+    return _conversion_cache
+
+
+def disable_cache():
+    """ Disable the conversion cache and discard its contents """
+    global _conversion_cache
+    _conversion_cache = None
+
+
+def clear_cache():
+    """ Discard cached entries and reset statistics """
+    if _conversion_cache is not None:
+        _conversion_cache.clear()
+
+
+def cache_info():
+    """ Report conversion cache statistics
+
+    Output: CacheInfo namedtuple, or None when the cache is disabled
+    """
+    if _conversion_cache is None:
+        return None
+    return _conversion_cache.info()
+
+
+def get_conversion_cache():
+    """ Return the active LRUCache object, or None when disabled """
+    return _conversion_cache
+
+
+def label_info(label_short, base=None):
+    """ Identify label metadata (base, k_divisor, prefix, etc.)
+
+    Metadata comes from the precomputed LABEL_TABLE, so no cache is needed.
+
+    Input:
+        - label_short: Short unit label (e.g.: 'GiB')
+        - base: Optional base for ambiguous labels (b/B)
+
+    Output: LabelInfo namedtuple
+    """
+    return LABEL_TABLE[label_index(label_short, base=base)]
+
+
+def convert(value, label_short, target_labels, base=None):
+    """ Convert value to each target label, consulting the cache if enabled
+
+    Input:
+        - value: Numeric value at label_short
+        - label_short: Short unit label of value
+        - target_labels: Iterable of short target unit labels
+        - base: Optional base for ambiguous label_short (b/B)
+
+    Output: Tuple of converted values, ordered as target_labels
+    """
+    target_labels = tuple(target_labels)
+    key = ('convert', value, label_short, base, target_labels)
+    cache = _conversion_cache
+    if cache is not None:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    index = label_index(label_short, base=base)
+    result = tuple(
+        value * CONVERSION_TABLE[index][label_index(target)]
+        for target in target_labels)
+
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def label_to_bits_factor(label_short, base=None):
+    """ Identify the number of bits represented by one unit of label_short
+
+    Input:
+        - label_short: Short unit label (e.g.: 'GiB')
+        - base: Optional base for ambiguous labels (b/B)
+
+    Output: Integer count of bits in a single unit of label_short
+    """
+    return LABEL_TABLE[label_index(label_short, base=base)].bits
+
+
+def convert_many(values, from_label, to_labels, base=None):
+    """ Convert a sequence of values from one unit label to many others
+
+    Conversion factors are resolved once per label, so the per-element cost
+    is a single multiplication instead of a DataUnit instance. NumPy arrays
+    are returned when NumPy is installed, otherwise array('d') objects.
+
+    Input:
+        - values: NumPy array, buffer or iterable of numeric values
+        - from_label: Short unit label of input values
+        - to_labels: Short unit label(s) to convert values to
+        - base: Optional base for ambiguous from_label (b/B)
+
+    Output: Dictionary of target label: array of converted values
+    """
+    if isinstance(to_labels, str):
+        to_labels = [to_labels]
+    from array import array
+    np = get_numpy()
+    from_factor = label_to_bits_factor(from_label, base=base)
+
+    if np is not None:
+        source = np.asarray(values, dtype=np.float64)
+    elif isinstance(values, (array, memoryview)):
+        # Typed buffers iterate their elements without an intermediate list
+        source = values
+    else:
+        source = array('d', values)
+
+    converted = {}
+    for label in to_labels:
+        ratio = from_factor / label_to_bits_factor(label)
+        if np is not None:
+            converted[label] = source * ratio
+        else:
+            converted[label] = array('d', [v * ratio for v in source])
+    return converted
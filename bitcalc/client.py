@@ -0,0 +1,91 @@
+""" Thin client forwarding command lines to a running bitcalc daemon
+
+Only lightweight modules are imported here, so forwarding costs little more
+than interpreter start up. See bitcalc.server for the daemon and protocol.
+"""
+import json
+import os
+import socket
+import sys
+
+# Environment variables configuring the daemon address
+SOCKET_ENV = 'BITCALC_SOCKET'
+TCP_ENV = 'BITCALC_TCP'
+
+# Seconds the client waits for the daemon before falling back
+CLIENT_TIMEOUT = 5.0
+
+
+def default_socket_path():
+    """ Identify the default Unix domain socket path for this user
+
+    Output: String path
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'bitcalc.sock')
+    return '/tmp/bitcalc-{}.sock'.format(os.getuid())
+
+
+def parse_tcp_address(address):
+    """ Split "host:port" into a (host, port) tuple """
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def connect(socket_path=None, tcp_address=None, timeout=CLIENT_TIMEOUT):
+    """ Connect to a running daemon
+
+    Output: Connected socket object
+    """
+    if tcp_address:
+        return socket.create_connection(tcp_address, timeout=timeout)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        raise
+    return client
+
+
+def forward(argv, socket_path=None, tcp_address=None):
+    """ Forward command line arguments to a running daemon
+
+    Input:
+        - argv: List of argument strings
+        - socket_path: Unix domain socket path of the daemon
+        - tcp_address: Optional (host, port) tuple used instead
+
+    Output: Tuple of (exit status, output string); raises OSError when no
+            daemon is reachable
+    """
+    with connect(socket_path, tcp_address) as client:
+        client.sendall(json.dumps({'argv': argv}).encode('utf-8') + b'\n')
+        with client.makefile('rb') as response_file:
+            response = json.loads(response_file.readline())
+    if 'error' in response:
+        return 2, 'error: {}\n'.format(response['error'])
+    return response['status'], response['output']
+
+
+def main(argv=None):
+    """ Entry point for the client subcommand
+
+    Arguments are forwarded to the daemon addressed by BITCALC_TCP or
+    BITCALC_SOCKET (default socket path when neither is set). When no daemon
+    answers, the conversion runs in this process instead.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    tcp = os.environ.get(TCP_ENV)
+    tcp_address = parse_tcp_address(tcp) if tcp else None
+    socket_path = os.environ.get(SOCKET_ENV) or default_socket_path()
+    try:
+        status, output = forward(argv, socket_path, tcp_address)
+    except (OSError, ValueError):
+        from .interface import main
+        return main(argv)
+    sys.stdout.write(output)
+    if status:
+        sys.exit(status)
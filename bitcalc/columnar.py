@@ -0,0 +1,274 @@
+""" Memory mapped conversion of raw columnar size files
+
+Input files hold packed little-endian uint64 ('u8') or float64 ('f8')
+values. Files are memory mapped and processed chunk by chunk, so memory use
+stays flat however large the input is. Chunks are views into the mapping
+(no copies) whenever the host byte order is little-endian. Conversion
+factors come from the same label table DataUnit uses.
+
+NumPy (numpy.memmap) is used when installed; otherwise mmap and typed
+memoryviews are used.
+"""
+import mmap
+import os
+import sys
+from .bits import DataUnit, label_to_bits_factor
+from .compat import get_numpy
+from .interface import new_parser, validate_labels, format_table
+
+# Column type code to (NumPy dtype, memoryview format, item size)
+COLUMN_TYPES = {
+    'u8': ('<u8', 'Q', 8),
+    'f8': ('<f8', 'd', 8),
+}
+
+# Default number of values processed per chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _check_type(column_type):
+    if column_type not in COLUMN_TYPES:
+        raise ValueError('Invalid column type: {0}'.format(column_type))
+    return COLUMN_TYPES[column_type]
+
+
+def iter_chunks(path, column_type='u8', chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Map path and yield consecutive chunks of values
+
+    Input:
+        - path: Path of raw column file
+        - column_type: 'u8' (uint64) or 'f8' (float64), little-endian
+        - chunk_size: Number of values per chunk
+
+    Output: Generator of NumPy arrays or typed memoryviews (views into the
+            mapping; only valid until the next chunk is requested)
+    """
+    dtype, fmt, item_size = _check_type(column_type)
+    size = os.path.getsize(path)
+    if size % item_size:
+        raise ValueError('{0} is not a whole number of {1} values'.format(
+            path, column_type))
+    if not size:
+        return
+
+    np = get_numpy()
+    if np is not None:
+        column = np.memmap(path, dtype=dtype, mode='r')
+        for start in range(0, len(column), chunk_size):
+            yield column[start:start + chunk_size]
+        return
+
+    with open(path, 'rb') as column_file:
+        with mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                step = chunk_size * item_size
+                for start in range(0, size, step):
+                    chunk = view[start:start + step]
+                    try:
+                        if sys.byteorder == 'little':
+                            values = chunk.cast(fmt)
+                            try:
+                                yield values
+                            finally:
+                                values.release()
+                        else:
+                            # Big-endian hosts need a swapped copy per chunk
+                            from array import array
+                            values = array(fmt)
+                            values.frombytes(chunk)
+                            values.byteswap()
+                            yield values
+                    finally:
+                        chunk.release()
+            finally:
+                view.release()
+
+
+def convert_file(input_path, from_label, to_label, output_path,
+                 column_type='u8', chunk_size=DEFAULT_CHUNK_SIZE, base=None):
+    """ Convert a raw column file into a mapped float64 output file
+
+    Input:
+        - input_path: Path of raw column file
+        - from_label: Short unit label of input values
+        - to_label: Short unit label of output values
+        - output_path: Path of little-endian float64 file to create
+        - column_type: 'u8' or 'f8' (see iter_chunks)
+        - chunk_size: Number of values per chunk
+        - base: Optional base for ambiguous from_label (b/B)
+
+    Output: Number of values written
+    """
+    ratio = (label_to_bits_factor(from_label, base=base)
+             / label_to_bits_factor(to_label))
+    item_size = _check_type(column_type)[2]
+    count = os.path.getsize(input_path) // item_size
+    if os.path.exists(output_path) and \
+            os.path.samefile(input_path, output_path):
+        # Opening the output would truncate the input before it is read
+        raise ValueError('Output is the input file: {0}'.format(output_path))
+
+    with open(output_path, 'w+b') as output_file:
+        output_file.truncate(count * 8)
+        if not count:
+            return 0
+        np = get_numpy()
+        if np is not None:
+            output = np.memmap(output_file, dtype='<f8', mode='r+',
+                               shape=(count,))
+            position = 0
+            for chunk in iter_chunks(input_path, column_type, chunk_size):
+                target = output[position:position + len(chunk)]
+                np.multiply(chunk, ratio, out=target, casting='unsafe')
+                position += len(chunk)
+            output.flush()
+            del output
+            return count
+
+        from array import array
+        with mmap.mmap(output_file.fileno(), count * 8) as m:
+            view = memoryview(m)
+            position = 0
+            for chunk in iter_chunks(input_path, column_type, chunk_size):
+                converted = array('d', [v * ratio for v in chunk])
+                if sys.byteorder != 'little':
+                    converted.byteswap()
+                end = position + len(converted) * 8
+                view[position:end] = memoryview(converted).cast('B')
+                position = end
+            view.release()
+            m.flush()
+    return count
+
+
+def reduce_file(input_path, from_label, column_type='u8',
+                chunk_size=DEFAULT_CHUNK_SIZE, base=None):
+    """ Reduce a raw column file to aggregates in bits
+
+    Input:
+        - input_path: Path of raw column file
+        - from_label: Short unit label of input values
+        - column_type: 'u8' or 'f8' (see iter_chunks)
+        - chunk_size: Number of values per chunk
+        - base: Optional base for ambiguous from_label (b/B)
+
+    Output: Dictionary with count, sum, min and max (sum/min/max in bits;
+            None when the file is empty)
+    """
+    factor = label_to_bits_factor(from_label, base=base)
+    np = get_numpy()
+    count = 0
+    total = 0
+    minimum = None
+    maximum = None
+    for chunk in iter_chunks(input_path, column_type, chunk_size):
+        count += len(chunk)
+        if np is not None:
+            chunk_sum = float(chunk.sum(dtype=np.float64))
+            chunk_min = chunk.min().item()
+            chunk_max = chunk.max().item()
+        else:
+            chunk_sum = sum(chunk)
+            chunk_min = min(chunk)
+            chunk_max = max(chunk)
+        total += chunk_sum
+        minimum = chunk_min if minimum is None else min(minimum, chunk_min)
+        maximum = chunk_max if maximum is None else max(maximum, chunk_max)
+    return {
+        'count': count,
+        'sum': total * factor if count else None,
+        'min': minimum * factor if count else None,
+        'max': maximum * factor if count else None,
+    }
+
+
+def format_aggregates(aggregates, target_label):
+    """ Format reduce_file output as a table at target_label
+
+    Output: Table string
+    """
+    row_labels = []
+    units = []
+    if aggregates['count']:
+        aggregates = dict(aggregates)
+        aggregates['mean'] = aggregates['sum'] / aggregates['count']
+        for name in ('sum', 'min', 'max', 'mean'):
+            row_labels.append(name.title())
+            units.append(DataUnit.from_bits(aggregates[name], target_label))
+    return 'Values: {c}\n{t}'.format(
+        c=aggregates['count'],
+        t=format_table(units, row_labels=row_labels))
+
+
+def parse_args(argv=None):
+    """ Parse column mode arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc column mode - convert or reduce raw little-endian '
+    desc += 'uint64/float64 files through memory maps'
+    parser = new_parser(prog='bitcalc --column', description=desc)
+
+    # Argument: --column (required, selects this parser)
+    help_str = 'specify raw column file to read'
+    parser.add_argument('--column', help=help_str, required=True)
+
+    # Argument: label (positional, required)
+    help_str = 'specify short unit label of column values'
+    parser.add_argument('label', help=help_str)
+
+    # Argument: target_label (positional, required)
+    help_str = 'specify short unit label conversion target'
+    parser.add_argument('target_label', help=help_str)
+
+    # Argument: -t --type (optional)
+    help_str = 'specify column value type (default: u8)'
+    parser.add_argument(
+        '-t', '--type', help=help_str, choices=sorted(COLUMN_TYPES),
+        default='u8')
+
+    # Argument: -w --write (optional)
+    help_str = 'write converted float64 column to file instead of '
+    help_str += 'printing aggregates'
+    parser.add_argument('-w', '--write', help=help_str)
+
+    # Argument: -c --chunk-size (optional)
+    help_str = 'specify values per chunk (default: {})'.format(
+        DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        '-c', '--chunk-size', help=help_str, type=int,
+        default=DEFAULT_CHUNK_SIZE)
+
+    # Argument: -b --base (optional, only effective for b/B)
+    help_str = 'specify base for ambiguous unit labels'
+    parser.add_argument(
+        '-b', '--base', help=help_str, type=int, choices=[2, 10])
+
+    args = parser.parse_args(argv)
+    validate_labels([args.label, args.target_label])
+    if args.chunk_size < 1:
+        parser.error('chunk size must be at least 1')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for column mode command line invocation """
+    args = parse_args(argv)
+    try:
+        if args.write:
+            count = convert_file(
+                args.column, args.label, args.target_label, args.write,
+                args.type, args.chunk_size, base=args.base)
+            print('Wrote {c} {ls} values to {p}'.format(
+                c=count, ls=args.target_label, p=args.write))
+        else:
+            aggregates = reduce_file(
+                args.column, args.label, args.type, args.chunk_size,
+                base=args.base)
+            print(format_aggregates(aggregates, args.target_label))
+    except (OSError, ValueError) as exc:
+        sys.exit('error: {}'.format(exc))
@@ -0,0 +1,22 @@
+""" Optional dependency handling
+
+Optional packages are imported on first use so they never cost start up time
+for callers that do not need them.
+"""
+_MISSING = object()
+_numpy = _MISSING
+
+
+def get_numpy():
+    """ Import NumPy on first use
+
+    Output: numpy module, or None when NumPy is not installed
+    """
+    global _numpy
+    if _numpy is _MISSING:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
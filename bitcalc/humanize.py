@@ -0,0 +1,94 @@
+""" Auto-scaled formatting of many sizes
+
+Each value is shown at the largest label of its base that keeps it at or
+above 1 (e.g.: 1536 B as 1.500 KiB). Labels are picked by binary search
+over the bit counts of the base's labels, precomputed from LABEL_TABLE, and
+every label has a prebuilt format string, so the cost per value is one
+search plus one format call.
+"""
+from bisect import bisect_right
+from .bits import LABEL_TABLE, label_to_bits_factor
+from .compat import get_numpy
+
+# (base, bit labels, precision) to Scale, built on first use
+_SCALES = {}
+
+
+class Scale:
+    """ Sorted label thresholds and format strings for one base """
+    __slots__ = ('thresholds', 'labels', 'formats')
+
+    def __init__(self, base=2, bit_labels=False, precision=3):
+        base = 'base-{}'.format(base) if isinstance(base, int) else base
+        infos = sorted(
+            (info for info in LABEL_TABLE
+             if info.base == base and info.is_bit == bit_labels),
+            key=lambda info: info.bits)
+        if not infos:
+            raise ValueError('Invalid base: {0}'.format(base))
+        self.thresholds = tuple(info.bits for info in infos)
+        self.labels = tuple(info.label_short for info in infos)
+        self.formats = tuple(
+            '{{:.{p}f}} {ls}'.format(p=precision, ls=info.label_short)
+            for info in infos)
+
+    def index(self, bits):
+        """ Identify the index of the best fitting label for bits """
+        return max(bisect_right(self.thresholds, abs(bits)) - 1, 0)
+
+
+def get_scale(base=2, bit_labels=False, precision=3):
+    """ Return the cached Scale for base, bit_labels and precision """
+    key = (base, bit_labels, precision)
+    scale = _SCALES.get(key)
+    if scale is None:
+        scale = _SCALES[key] = Scale(base, bit_labels, precision)
+    return scale
+
+
+def humanize(values, label_short='B', base=2, precision=3, bit_labels=False):
+    """ Format many values at their best fitting labels
+
+    Input:
+        - values: NumPy array, buffer or iterable of numeric values
+        - label_short: Short unit label of values
+        - base: Base of output labels (2 or 10)
+        - precision: Number of decimal places
+        - bit_labels: Output bit labels (b, Kib, ...) instead of bytes
+
+    Output: List of strings such as '1.500 KiB', ordered as values
+    """
+    scale = get_scale(base, bit_labels, precision)
+    factor = label_to_bits_factor(label_short, base=base)
+    thresholds = scale.thresholds
+    formats = scale.formats
+    np = get_numpy()
+    if np is not None:
+        bits = np.asarray(values, dtype=np.float64) * factor
+        indexes = np.searchsorted(thresholds, np.abs(bits), side='right') - 1
+        np.maximum(indexes, 0, out=indexes)
+        scaled = bits / np.asarray(thresholds, dtype=np.float64)[indexes]
+        return [formats[i].format(v)
+                for i, v in zip(indexes.tolist(), scaled.tolist())]
+
+    humanized = []
+    append = humanized.append
+    for value in values:
+        bits = value * factor
+        index = bisect_right(thresholds, bits if bits >= 0 else -bits) - 1
+        if index < 0:
+            index = 0
+        append(formats[index].format(bits / thresholds[index]))
+    return humanized
+
+
+def humanize_value(value, label_short='B', base=2, precision=3,
+                   bit_labels=False):
+    """ Format a single value at its best fitting label (see humanize)
+
+    Output: String such as '1.500 KiB'
+    """
+    scale = get_scale(base, bit_labels, precision)
+    bits = value * label_to_bits_factor(label_short, base=base)
+    index = scale.index(bits)
+    return scale.formats[index].format(bits / scale.thresholds[index])
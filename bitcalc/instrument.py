@@ -0,0 +1,215 @@
+""" Opt-in call counting and timing of bitcalc hot paths
+
+When enabled (enable(), or profile_main for command lines with --profile
+options or BITCALC_PROFILE set), the functions listed in STAGES are replaced
+by timing wrappers; disable() puts the originals back. Nothing is wrapped
+while disabled, so instrumentation costs nothing until it is switched on.
+
+Timings are inclusive: a stage called from another stage (e.g.: DataUnit
+construction inside generate_data_unit_list) is counted in both.
+"""
+import os
+import sys
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from time import perf_counter
+
+# Environment variable running every command line under profile_main
+PROFILE_ENV = 'BITCALC_PROFILE'
+
+# (module, attribute path, stage name) of every instrumented function
+STAGES = (
+    ('bitcalc.bits', 'label_index', 'label_index'),
+    ('bitcalc.bits', 'DataUnit.__init__', 'data_unit'),
+    ('bitcalc.interface', 'generate_data_unit_list',
+     'generate_data_unit_list'),
+    ('bitcalc.time', 'Duration.timestamp_to_seconds', 'duration_parse'),
+    ('bitcalc.time', 'Duration.timestamps_to_seconds', 'duration_parse'),
+    ('bitcalc.interface', 'format_table', 'format_table'),
+    ('bitcalc.interface', 'write_table', 'format_table'),
+)
+
+StageStats = namedtuple('StageStats', ['calls', 'seconds'])
+
+# Stage name to [calls, seconds]; updated in place by the wrappers
+_stats = OrderedDict((stage, [0, 0.0]) for _, _, stage in STAGES)
+
+# (owner, attribute name, original value) of every replaced attribute
+_patches = []
+
+# True while profile_main is running the command line interface
+_in_profile_main = False
+
+
+def _timed(stage, func):
+    stats = _stats[stage]
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += perf_counter() - start
+    return wrapper
+
+
+def _patch(owner, name, value):
+    _patches.append((owner, name, owner.__dict__[name]))
+    setattr(owner, name, value)
+
+
+def is_enabled():
+    """ Report whether instrumentation wrappers are installed """
+    return bool(_patches)
+
+
+def enable():
+    """ Install timing wrappers on every stage (no-op when enabled) """
+    from importlib import import_module
+    # Import targets first; importing bitcalc.interface may enable already
+    modules = [import_module(module_name) for module_name, _, _ in STAGES]
+    if _patches:
+        return
+    for owner, (_, path, stage) in zip(modules, STAGES):
+        *owner_path, name = path.split('.')
+        for attribute in owner_path:
+            owner = getattr(owner, attribute)
+        original = owner.__dict__[name]
+        if isinstance(original, staticmethod):
+            _patch(owner, name, staticmethod(_timed(
+                stage, original.__func__)))
+            continue
+        wrapper = _timed(stage, original)
+        _patch(owner, name, wrapper)
+        if owner_path:
+            continue
+        # Modules that imported the function by name hold their own
+        # reference; replace those too
+        for module_name_, module in list(sys.modules.items()):
+            if (module_name_.startswith('bitcalc.') and module is not owner
+                    and module.__dict__.get(name) is original):
+                _patch(module, name, wrapper)
+
+
+def disable():
+    """ Remove timing wrappers, restoring the original functions """
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+
+
+def reset():
+    """ Zero every stage's call count and time """
+    for stats in _stats.values():
+        stats[0] = 0
+        stats[1] = 0.0
+
+
+def snapshot():
+    """ Capture call counts and accumulated seconds per stage
+
+    Output: OrderedDict of stage name: StageStats
+    """
+    return OrderedDict(
+        (stage, StageStats(*stats)) for stage, stats in _stats.items())
+
+
+def format_snapshot(stats=None):
+    """ Format a snapshot as a text breakdown
+
+    Input:
+        - stats: Output of snapshot (default: current snapshot)
+
+    Output: String with one line per stage
+    """
+    stats = snapshot() if stats is None else stats
+    lines = ['{s: <26}{c: >10}{t: >14}{p: >12}\n'.format(
+        s='stage', c='calls', t='total ms', p='us/call')]
+    for stage, stage_stats in stats.items():
+        lines.append('{s: <26}{c: >10}{t: >14.3f}{p: >12.3f}\n'.format(
+            s=stage,
+            c=stage_stats.calls,
+            t=stage_stats.seconds * 10**3,
+            p=stage_stats.seconds / stage_stats.calls * 10**6
+            if stage_stats.calls else 0))
+    return ''.join(lines)
+
+
+def split_profile_args(argv):
+    """ Remove --profile and --profile-dump FILE from argv
+
+    Input:
+        - argv: List of argument strings
+
+    Output: Tuple of (remaining argv, dump path or None)
+    """
+    remaining = []
+    dump_path = None
+    args = iter(argv)
+    for arg in args:
+        if arg == '--profile':
+            continue
+        elif arg == '--profile-dump':
+            dump_path = next(args, None)
+            if dump_path is None:
+                sys.exit('error: --profile-dump requires a file')
+        elif arg.startswith('--profile-dump='):
+            dump_path = arg.partition('=')[2]
+        else:
+            remaining.append(arg)
+    return remaining, dump_path
+
+
+def wants_profile(argv):
+    """ Identify whether a command line should run under profile_main
+
+    Input:
+        - argv: List of argument strings
+
+    Output: True when argv has profile options or PROFILE_ENV is set, unless
+            profile_main is already running
+    """
+    if _in_profile_main:
+        return False
+    return bool(os.environ.get(PROFILE_ENV)) or any(
+        arg == '--profile' or arg.startswith('--profile-dump')
+        for arg in argv)
+
+
+def profile_main(argv):
+    """ Run the command line interface with instrumentation enabled
+
+    A stage breakdown is written to stderr after the command's output. With
+    --profile-dump FILE, the run is also profiled with cProfile and the
+    statistics are saved to FILE for pstats.
+
+    Input:
+        - argv: List of argument strings, including profile options
+    """
+    global _in_profile_main
+    from .interface import main
+    argv, dump_path = split_profile_args(argv)
+    was_enabled = is_enabled()
+    enable()
+    _in_profile_main = True
+    profiler = None
+    if dump_path:
+        from cProfile import Profile
+        profiler = Profile()
+        profiler.enable()
+    try:
+        return main(argv)
+    finally:
+        _in_profile_main = False
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(dump_path)
+        sys.stdout.flush()
+        sys.stderr.write('\nProfile:\n{}'.format(format_snapshot()))
+        if dump_path:
+            sys.stderr.write('cProfile statistics written to {}\n'.format(
+                dump_path))
+        if not was_enabled:
+            disable()
@@ -1,28 +1,110 @@
 import sys
-from argparse import ArgumentParser, RawTextHelpFormatter
-from .bits import DATA_LABEL_MAP, DataUnit, DataRate
+from types import SimpleNamespace
+from .bits import (DATA_LABEL_MAP, DataUnit, DataRate, ExactDataUnit,
+                   convert, get_conversion_cache)
 
 LABELS_B2 = list(DATA_LABEL_MAP['base-2'].keys())
 LABELS_B10 = list(DATA_LABEL_MAP['base-10'].keys())
+FAST_PATH_LABELS = frozenset(LABELS_B2 + LABELS_B10)
 
 
-def parse_args():
-    """ Parse input arguments provided by user
+# Subcommand name to submodule implementing it (module exposes main(argv))
+SUBCOMMANDS = {
+    'scan': 'scan',
+    'serve': 'server',
+    'client': 'client',
+    'meter': 'meter',
+    'rate': 'sampler',
+    'probe': 'probe',
+    'layout': 'layout',
+}
 
-    Output: Namespace object containing validated argument values
+# Prefix shared by the --profile and --profile-dump options
+PROFILE_OPTIONS_PREFIX = '--profile'
+
+# Values of optional arguments when the argparse parser is skipped
+FAST_PATH_DEFAULTS = {
+    'base': None,
+    'duration': None,
+    'rate': None,
+    'alt': False,
+    'output_format': 'table',
+}
+
+
+def new_parser(**kwargs):
+    """ Build an ArgumentParser with custom error handler
+
+    argparse is imported here rather than at module level so that the common
+    positional-only invocation never pays for it.
+
+    Input:
+        - kwargs: Keyword arguments passed through to ArgumentParser
+
+    Output: ArgumentParser object
     """
+    from argparse import ArgumentParser, RawTextHelpFormatter
 
-    # Define Parser class with custom error handler
     class Parser(ArgumentParser):
         def error(self, message):
             sys.stderr.write('error: {0}\n'.format(message))
             self.print_help()
             sys.exit(2)
 
+    kwargs.setdefault('formatter_class', RawTextHelpFormatter)
+    return Parser(**kwargs)
+
+
+def parse_args_fast(argv):
+    """ Parse positional-only invocations (count label [target_labels]) by hand
+
+    Input:
+        - argv: List of argument strings
+
+    Output: Namespace object equivalent to parse_args output, or None when
+            argv needs the full argparse parser (options, help, errors)
+    """
+    if len(argv) < 2:
+        return None
+    for arg in argv:
+        if arg.startswith('-'):
+            return None
+    try:
+        count = float(argv[0])
+    except ValueError:
+        return None
+    labels = FAST_PATH_LABELS
+    for label in argv[1:]:
+        if label not in labels:
+            return None
+    return SimpleNamespace(
+        count=count,
+        label=argv[1],
+        target_labels=argv[2:],
+        **FAST_PATH_DEFAULTS)
+
+
+def parse_args(argv=None):
+    """ Parse input arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings (defaults to sys.argv)
+
+    Output: Namespace object containing validated argument values
+    """
+
     # Program title and description
     desc = 'Bitcalc - A command line utility for quick conversion and '
     desc += 'comparison of bit/byte values'
-    parser = Parser(description=desc, formatter_class=RawTextHelpFormatter)
+    epilog = 'other modes:'
+    epilog += '\n  bitcalc --stream -h'
+    epilog += '\n  bitcalc --column FILE -h'
+    for name in SUBCOMMANDS:
+        epilog += '\n  bitcalc {} -h'.format(name)
+    epilog += '\n\nprofiling (any mode):'
+    epilog += '\n  --profile              print a stage timing breakdown'
+    epilog += '\n  --profile-dump FILE    also save cProfile statistics'
+    parser = new_parser(description=desc, epilog=epilog)
 
     # Argument: count (positional, required)
     help_str = 'specify bit/byte count (numeric)'
@@ -57,6 +139,7 @@ def parse_args():
 
     # Argument: -r --rate (optional)
     help_str = 'specify rate for conversion to duration (e.g.: 10/s)'
+    help_str += '\n format examples: [37|37/s|2/m|10Gbps|37 MiB/s]'
     help_str += '\n requires: target_labels specified (first used)'
     parser.add_argument('-r', '--rate', help=help_str)
 
@@ -64,7 +147,15 @@ def parse_args():
     help_str = 'print alternate table (both base-2 and base-10 units)'
     parser.add_argument('-a', '--alt', help=help_str, action='store_true')
 
-    return validate_args(parser.parse_args())
+    # Argument: -o --output-format (optional)
+    help_str = 'specify conversion table output format (default: table)'
+    parser.add_argument(
+        '-o', '--output-format',
+        help=help_str,
+        choices=OUTPUT_FORMATS,
+        default='table')
+
+    return validate_args(parser.parse_args(argv))
 
 
 def validate_args(args):
@@ -80,16 +171,27 @@ def validate_args(args):
     Output: The same args namespace object that was input
     """
 
-    # Build list of all valid labels
-    all_labels = []
-    all_labels.extend(LABELS_B2)
-    all_labels.extend(LABELS_B10)
-
     # Build list of all labels specified in input
     input_labels = []
     input_labels.append(args.label)
     input_labels.extend(args.target_labels)
 
+    validate_labels(input_labels)
+    return args
+
+
+def validate_labels(input_labels):
+    """ Validate all labels are known short unit labels; exit conditionally
+
+    Input:
+        - input_labels: List of short unit label strings
+    """
+
+    # Build list of all valid labels
+    all_labels = []
+    all_labels.extend(LABELS_B2)
+    all_labels.extend(LABELS_B10)
+
     # Validate all input_labels exist in all_labels list
     for label in input_labels:
         if label not in all_labels:
@@ -97,91 +199,211 @@ def validate_args(args):
             print(help_str)
             sys.exit(2)
 
-    return args
-
 
 def format_decimal_value(value):
     """ Format number as string, limiting decimal length based on value
 
     Input:
-        - value: Integer or float
+        - value: Integer, float, Fraction or Decimal
 
     Output: String containing converted value
     """
-    if value > 1:
-        # Format as 3 point decimal for smaller amounts
-        return "{:0.3f}".format(value).rstrip("0").rstrip(".")
+    places = 3 if value > 1 else 8
+    if isinstance(value, float):
+        # Format as 3 point decimal for larger amounts, 8 for smaller
+        return "{:0.{}f}".format(value, places).rstrip("0").rstrip(".")
     else:
-        # Format as 15 point decimal for smaller amounts
-        return "{:0.8f}".format(value).rstrip("0").rstrip(".")
+        # Exact values are rounded here and nowhere else
+        return format_exact_value(value, places).rstrip("0").rstrip(".")
+
 
+def format_exact_value(value, places):
+    """ Format exact number as fixed point string without passing via float
 
-def format_table(units, units2=None):
+    Input:
+        - value: Integer, Fraction or Decimal
+        - places: Number of decimal places (rounded half to even)
+
+    Output: String containing value with exactly places decimals
+    """
+    from fractions import Fraction
+    scaled = round(Fraction(value) * 10**places)
+    sign = '-' if scaled < 0 else ''
+    whole, fraction = divmod(abs(scaled), 10**places)
+    return '{s}{w}.{f:0{p}d}'.format(s=sign, w=whole, f=fraction, p=places)
+
+
+def format_table(units, units2=None, row_labels=None):
     """ Format table content for eventual command line output
 
     Input:
         - units: List of DataUnit objects containing values to represent in rows
         - units2: Optional list of units to be used in combination table
                   formatting; length must match len(units)
+        - row_labels: Optional list of strings replacing the unit label cell
+                      of single tables (e.g.: statistic names); length must
+                      match len(units)
 
     Output: Table string used for command line tabular data output
     """
+    return ''.join(iter_table(units, units2, row_labels))
+
+
+def iter_table(units, units2=None, row_labels=None):
+    """ Generate table lines one at a time (see format_table for input)
+
+    Output: Generator of newline terminated table line strings
+    """
     if not units2:
-        # Format table header and add to content string
-        header = format_table_row_single('(lbl)', 'Unit Label', 'Value')
+        # Format table header
+        header = format_table_row_single(
+            '(lbl)', 'Unit Label' if not row_labels else 'Label', 'Value')
         divider = format_table_divider(header)
-        content = ''
-        content += '{}\n'.format(divider)
-        content += '{}\n'.format(header)
-        content += '{}\n'.format(divider)
-
-        # Update content string with each target unit
-        for unit in units:
-            output_str = format_table_row_single(
+        yield '{}\n{}\n{}\n'.format(divider, header, divider)
+
+        # Yield a row for each target unit
+        for idx, unit in enumerate(units):
+            yield '{}\n'.format(format_table_row_single(
                 '({})'.format(unit.label_short),
-                '{}s'.format(unit.label.title()),
-                format_decimal_value(unit.value))
-            content += '{}\n'.format(output_str)
+                row_labels[idx] if row_labels else '{}s'.format(
+                    unit.label.title()),
+                format_decimal_value(unit.value)))
 
         # Append divider to end of table
-        content += '{}\n'.format(divider)
+        yield '{}\n'.format(divider)
     else:
-        # Format table header and add to content string
+        # Format table header
         header = format_table_row_combo('Value (base-2)', 'Value (base-10)')
         divider = format_table_divider(header)
-        content = ''
-        content += '{}\n'.format(divider)
-        content += '{}\n'.format(header)
-        content += '{}\n'.format(divider)
-
-        # Identify which set of units is base-2 and save to convenience names
-        if units[0].base == 'base-2':
-            b2_units = units
-            b10_units = units2
-        else:
-            b2_units = units2
-            b10_units = units
-
-        # Add each row of unit conversions to content string
-        for idx, unit in enumerate(b2_units):
+        yield '{}\n{}\n{}\n'.format(divider, header, divider)
+
+        # Yield each row of unit conversions
+        for b2_unit, b10_unit in zip(*order_by_base(units, units2)):
             b2_str = '{v} {ls: <3}'.format(
-                v=format_decimal_value(b2_units[idx].value),
-                ls=b2_units[idx].label_short)
+                v=format_decimal_value(b2_unit.value),
+                ls=b2_unit.label_short)
             b10_str = '{v} {ls: <2}'.format(
-                v=format_decimal_value(b10_units[idx].value),
-                ls=b10_units[idx].label_short)
-            output_str = format_table_row_combo(b2_str, b10_str)
-            content += '{}\n'.format(output_str)
+                v=format_decimal_value(b10_unit.value),
+                ls=b10_unit.label_short)
+            yield '{}\n'.format(format_table_row_combo(b2_str, b10_str))
 
         # Append divider to end of table
-        content += '{}\n'.format(divider)
+        yield '{}\n'.format(divider)
+
+
+def order_by_base(units, units2):
+    """ Identify which of two unit lists is base-2
+
+    Output: Tuple of (base-2 units, base-10 units)
+    """
+    if units[0].base == 'base-2':
+        return units, units2
+    return units2, units
+
+
+# Output formats supported by write_table
+OUTPUT_FORMATS = ('table', 'csv', 'tsv', 'json')
+
+
+def format_machine_value(value):
+    """ Format number for machine consumption without rounding floats
+
+    Input:
+        - value: Integer, float, Fraction or Decimal
+
+    Output: String containing value
+    """
+    if isinstance(value, (int, float)):
+        return repr(value)
+    from fractions import Fraction
+    # Decimal expansion is finite when the denominator has only 2s and 5s
+    denominator = Fraction(value).denominator
+    twos = fives = 0
+    while denominator % 2 == 0:
+        denominator //= 2
+        twos += 1
+    while denominator % 5 == 0:
+        denominator //= 5
+        fives += 1
+    places = max(twos, fives) if denominator == 1 else 30
+    return format_exact_value(value, places).rstrip('0').rstrip('.') or '0'
+
+
+def iter_records(units, units2=None, row_labels=None):
+    """ Generate one dictionary per table row (see format_table for input)
+
+    Output: Generator of dictionaries keyed by column name
+    """
+    if not units2:
+        for idx, unit in enumerate(units):
+            record = {}
+            if row_labels:
+                record['name'] = row_labels[idx]
+            record['label_short'] = unit.label_short
+            record['label'] = unit.label
+            record['value'] = unit.value
+            yield record
+    else:
+        for b2_unit, b10_unit in zip(*order_by_base(units, units2)):
+            yield {
+                'base2_label_short': b2_unit.label_short,
+                'base2_value': b2_unit.value,
+                'base10_label_short': b10_unit.label_short,
+                'base10_value': b10_unit.value,
+            }
+
+
+def write_table(output_file, units, units2=None, row_labels=None,
+                output_format='table'):
+    """ Write table rows straight to output_file without building a string
+
+    Input:
+        - output_file: File object to write to
+        - units, units2, row_labels: See format_table
+        - output_format: One of OUTPUT_FORMATS (table, csv, tsv, json)
+    """
+    if output_format == 'table':
+        for line in iter_table(units, units2, row_labels):
+            output_file.write(line)
+    elif output_format in ('csv', 'tsv'):
+        import csv
+        writer = None
+        delimiter = ',' if output_format == 'csv' else '\t'
+        for record in iter_records(units, units2, row_labels):
+            if writer is None:
+                writer = csv.DictWriter(
+                    output_file, fieldnames=list(record),
+                    delimiter=delimiter, lineterminator='\n')
+                writer.writeheader()
+            writer.writerow({
+                key: format_machine_value(value)
+                if not isinstance(value, str) else value
+                for key, value in record.items()})
+    elif output_format == 'json':
+        import json
+        separator = '[\n'
+        for record in iter_records(units, units2, row_labels):
+            for key, value in record.items():
+                if not isinstance(value, (str, int, float)):
+                    record[key] = float(value)
+            output_file.write(separator)
+            output_file.write(json.dumps(record))
+            separator = ',\n'
+        output_file.write('[]\n' if separator == '[\n' else '\n]\n')
+    else:
+        raise ValueError('Invalid output format: {0}'.format(output_format))
+
 
-    return content
+# Cache of divider strings keyed by header layout
+_DIVIDER_CACHE = {}
 
 
 def format_table_divider(scan_str, match_char='|', i_char='+', fill_char='-'):
     """ Format and return a divider for use in table printing
 
+    Dividers depend only on the header layout, so each is built once and
+    cached.
+
     Input:
         - scan_str: Full string to analyze for character matching
         - match_char: Character that indicates a match
@@ -190,13 +412,12 @@ def format_table_divider(scan_str, match_char='|', i_char='+', fill_char='-'):
 
     Output: String to be used as a divider in tabular data output
     """
-    i_positions = [idx for idx, c in enumerate(scan_str) if c == match_char]
-    divider = ''
-    for i in range(len(scan_str)):
-        if i in i_positions:
-            divider += i_char
-        else:
-            divider += fill_char
+    key = (scan_str, match_char, i_char, fill_char)
+    divider = _DIVIDER_CACHE.get(key)
+    if divider is None:
+        divider = ''.join(
+            i_char if c == match_char else fill_char for c in scan_str)
+        _DIVIDER_CACHE[key] = divider
     return divider
 
 
@@ -240,28 +461,28 @@ def generate_data_unit_list(base_unit, target_labels):
 
     Output: List of DataUnit objects
     """
+    # Exact units produce exact targets; everything else converts via float
+    if isinstance(base_unit, ExactDataUnit):
+        unit_class = ExactDataUnit
+    else:
+        unit_class = DataUnit
+
+    # Reuse a previously generated list when the conversion cache is enabled;
+    # cached units are never handed out, so callers may modify their copies
+    cache = get_conversion_cache()
+    if cache is not None:
+        key = ('units', unit_class, base_unit.bits, tuple(target_labels))
+        units = cache.get(key)
+        if units is not None:
+            return [unit.copy() for unit in units]
+
     units = []
     for short_label in target_labels:
-        # Identify if target label represents bit or byte value
-        if DataUnit.is_bit(short_label):
-            new_value = base_unit.bits
-        else:
-            new_value = base_unit.bytes
-
-        # Identify k_divisor based on short_label's base
-        k_divisor = DataUnit.base_to_k_divisor(
-            DataUnit.label_to_base(short_label))
-
-        # Instantiate DataUnit object to represent target short_label
-        unit = DataUnit(
-            DataUnit.value_to_prefix(
-                new_value,
-                short_label[0].lower(),
-                k_divisor),
-            short_label)
-
-        # Append DataUnit object to list of units
-        units.append(unit)
+        # Scale base_unit bits by the precomputed bit count of short_label
+        units.append(unit_class.from_bits(base_unit.bits, short_label))
+
+    if cache is not None:
+        cache.put(key, tuple(unit.copy() for unit in units))
     return units
 
 
@@ -284,17 +505,73 @@ def format_data_rate(data_rate):
 
     Output: String to be used when presenting data rate
     """
-    return 'Data rate: {rate} {ls}/{tls}'.format(
+    return 'Data rate: {}'.format(format_rate_value(data_rate))
+
+
+def format_rate_value(data_rate):
+    """ Format the rate of given data_rate without a caption (e.g.: 8 MiB/s)
+
+    Input:
+        - data_rate: DataRate object
+
+    Output: String containing rate, short label and short time label
+    """
+    return '{rate} {ls}/{tls}'.format(
         rate=format_decimal_value(data_rate.rate),
         ls=data_rate.label_short,
         tls=data_rate.time_label[0])
 
 
-def main():
-    """ Main entry point for command line invocation """
+def format_conversion(args, input_value_str, units, units2=None):
+    """ Format conversion output according to args.output_format
+
+    Input:
+        - args: Namespace object of parsed arguments
+        - input_value_str: String describing the input value
+        - units, units2: See format_table
+
+    Output: String for printing, or None when rows were written directly to
+            stdout in a machine readable format
+    """
+    if args.output_format == 'table':
+        return '{}\n{}'.format(input_value_str, format_table(units, units2))
+    write_table(sys.stdout, units, units2, output_format=args.output_format)
+    return None
+
+
+def main(argv=None):
+    """ Main entry point for command line invocation
 
-    # Parse and validate arguments
-    args = parse_args()
+    Input:
+        - argv: Optional list of argument strings (defaults to sys.argv)
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Run under instrumentation and report a stage breakdown when asked
+    # with --profile options or the instrument.PROFILE_ENV variable
+    from . import instrument
+    if instrument.wants_profile(argv):
+        return instrument.profile_main(argv)
+
+    if argv and argv[0] in SUBCOMMANDS:
+        # Hand off to subcommand module with remaining arguments
+        from importlib import import_module
+        module = import_module('.' + SUBCOMMANDS[argv[0]], __package__)
+        return module.main(argv[1:])
+
+    if '--stream' in argv:
+        # Hand off to stream mode (newline delimited records from input)
+        from . import stream
+        return stream.main(argv)
+
+    if any(arg == '--column' or arg.startswith('--column=') for arg in argv):
+        # Hand off to column mode (memory mapped raw value files)
+        from . import columnar
+        return columnar.main(argv)
+
+    # Parse and validate arguments; skip argparse for plain positional input
+    args = parse_args_fast(argv) or parse_args(argv)
 
     # Instantiate input DataUnit object
     base_unit = DataUnit(args.count, args.label, base=args.base)
@@ -316,9 +593,8 @@ def main():
 
         if not args.duration and not args.rate:
             # Format conversion table with all target DataUnits
-            output_str = '{}\n{}'.format(
-                input_value_str,
-                format_table(target_units))
+            output_str = format_conversion(
+                args, input_value_str, target_units)
         elif args.duration:
             # Format duration and rate detail for input duration
             # Instantiate DataRate object from first target_unit
@@ -333,26 +609,24 @@ def main():
             # Format duration and rate detail for input rate
             rate_str = args.rate
 
-            # Configure rate detail
-            if '/' in rate_str:
-                # Split rate value and short time label (e.g.: R/L)
-                # Convert rate string to float
-                rate_value = float(rate_str[:rate_str.find('/')])
+            # Split rate string into value, optional label and time label
+            from .parsing import parse_rate
+            try:
+                rate_value, rate_label, short_time_label = parse_rate(
+                    rate_str)
+            except ValueError as exc:
+                sys.exit('error: {}'.format(exc))
+            if rate_label is not None:
+                # Express rate in the first target label (e.g.: 1 Gbps)
+                rate_value = convert(
+                    rate_value, rate_label, [target_units[0].label_short],
+                    base=args.base)[0]
 
-                # Capture short time label
-                short_time_label = rate_str[rate_str.find('/') + 1]
-
-                # Instantiate DataRate object from first target_unit
-                target_rate = DataRate(
-                    target_units[0],
-                    rate=rate_value,
-                    time_label_short=short_time_label)
-            else:
-                # Convert rate string to float
-                rate_value = float(rate_str)
-
-                # Instantiate DataRate object from first target_unit
-                target_rate = DataRate(target_units[0], rate=rate_value)
+            # Instantiate DataRate object from first target_unit
+            target_rate = DataRate(
+                target_units[0],
+                rate=rate_value,
+                time_label_short=short_time_label)
 
             # Format output_str
             output_str = '{v}\n{d}\n{r}\n'.format(
@@ -364,19 +638,16 @@ def main():
             # Format output_str with all base-2 and base-10 DataUnits
             b2_units = generate_data_unit_list(base_unit, LABELS_B2)
             b10_units = generate_data_unit_list(base_unit, LABELS_B10)
-            output_str = '{}\n{}'.format(
-                input_value_str,
-                format_table(b2_units, b10_units))
+            output_str = format_conversion(
+                args, input_value_str, b2_units, b10_units)
         elif base_unit.base == 'base-2':
             # Format output_str with all base-2 DataUnits
             b2_units = generate_data_unit_list(base_unit, LABELS_B2)
-            output_str = '{}\n{}'.format(
-                input_value_str,
-                format_table(b2_units))
+            output_str = format_conversion(args, input_value_str, b2_units)
         elif base_unit.base == 'base-10':
             # Format output_str with all base-10 DataUnits
             b10_units = generate_data_unit_list(base_unit, LABELS_B10)
-            output_str = '{}\n{}'.format(
-                input_value_str,
-                format_table(b10_units))
-    print(output_str)
+            output_str = format_conversion(
+                args, input_value_str, b10_units)
+    if output_str is not None:
+        print(output_str)
@@ -0,0 +1,445 @@
+""" Storage layout capacity over grids of disks, redundancy and reserve
+
+Every combination of disk size, disk count, scheme and filesystem reserve is
+evaluated at once: with NumPy the grid is one set of broadcast array
+operations, otherwise array('d') columns are filled in a single loop.
+Capacities are kept in bits, so disks sold in base-10 TB report directly in
+TiB (or any other label).
+
+Schemes:
+    - raid0, raid5, raid6: one array over all disks, or groups of a fixed
+      width with a ':width' suffix (e.g.: raid6:12 for RAID60 of 12 disks)
+    - raid10: mirrored pairs
+    - k+m: erasure coding groups of k data and m parity disks (e.g.: 8+3)
+
+Disks left over after the last whole group are counted as overhead.
+"""
+import sys
+from collections import namedtuple
+from itertools import product
+from .bits import DataUnit, label_to_bits_factor
+from .compat import get_numpy
+from .interface import (new_parser, validate_labels, format_decimal_value,
+                        format_table_divider)
+from .parsing import parse_quantity
+
+# Scheme name to (group width or None for all disks, parity disks per
+# group, copies of data)
+SCHEMES = {
+    'raid0': (None, 0, 1),
+    'raid5': (None, 1, 1),
+    'raid6': (None, 2, 1),
+    'raid10': (2, 0, 2),
+}
+
+# Sort and filter columns of a LayoutGrid
+COLUMNS = ('raw', 'usable', 'overhead', 'efficiency', 'disks')
+
+Layout = namedtuple('Layout', [
+    'scheme', 'disk_size', 'disks', 'reserve', 'raw', 'usable', 'overhead',
+    'efficiency'])
+
+
+def parse_scheme(scheme):
+    """ Resolve a scheme name to its group geometry
+
+    Input:
+        - scheme: Scheme string (e.g.: 'raid6', 'raid6:12', 'raid10', '8+3')
+
+    Output: Tuple of (group width or None for all disks, parity disks per
+            group, copies of data)
+    """
+    name, _, width = scheme.partition(':')
+    if '+' in name and not width:
+        data, _, parity = name.partition('+')
+        if data.isdigit() and parity.isdigit() and int(data):
+            return int(data) + int(parity), int(parity), 1
+    elif name in SCHEMES:
+        geometry = SCHEMES[name]
+        if not width:
+            return geometry
+        if width.isdigit() and geometry[0] is None and \
+                int(width) > geometry[1]:
+            return int(width), geometry[1], geometry[2]
+    raise ValueError('Invalid scheme: {0}'.format(scheme))
+
+
+def _data_disks(disks, geometry):
+    """ Count disks' worth of data capacity (NumPy arrays or ints) """
+    width, parity, copies = geometry
+    if width is None:
+        # One array over every disk; too few disks hold no data
+        return (disks - parity) * (disks > parity) / copies
+    return disks // width * (width - parity) / copies
+
+
+def _to_bits(size, base=None):
+    if isinstance(size, DataUnit):
+        return size.bits
+    if isinstance(size, str):
+        size = parse_quantity(size)
+    value, label_short = size
+    return value * label_to_bits_factor(label_short, base=base)
+
+
+def _take(column, indexes):
+    """ Select rows of a column by index (NumPy array or array) """
+    if get_numpy() is not None:
+        return column[indexes]
+    from array import array
+    return array(column.typecode, [column[index] for index in indexes])
+
+
+class LayoutGrid:
+    """ Capacity of every layout in a parameter grid
+
+    Rows are ordered scheme, disk size, disk count, reserve (last varies
+    fastest) until sorted; layouts holding no data are dropped.
+
+    Input:
+        - disk_sizes: Disk sizes at disk_label
+        - disk_counts: Numbers of disks
+        - schemes: Scheme strings (see parse_scheme)
+        - reserves: Fractions of filesystem capacity held back (e.g.: 0.05)
+        - disk_label: Short unit label of disk_sizes (default: TB, base-10
+                      as sold)
+        - base: Optional base for ambiguous disk_label (b/B)
+    """
+    def __init__(self, disk_sizes, disk_counts, schemes, reserves=(0,),
+                 disk_label='TB', base=None):
+        self.schemes = tuple(schemes)
+        self.disk_label = disk_label
+        geometries = [parse_scheme(scheme) for scheme in self.schemes]
+        factor = label_to_bits_factor(disk_label, base=base)
+        if min(reserves) < 0 or max(reserves) >= 1:
+            raise ValueError('Reserves must be fractions between 0 and 1')
+        if min(disk_sizes) <= 0:
+            raise ValueError('Disk sizes must be positive')
+        np = get_numpy()
+        if np is not None:
+            sizes = np.asarray(disk_sizes, dtype=np.float64)
+            counts = np.asarray(disk_counts, dtype=np.int64)
+            reserves = np.asarray(reserves, dtype=np.float64)
+            # Axes: scheme, disk size, disk count, reserve
+            data = np.array([
+                _data_disks(counts, geometry) for geometry in geometries],
+                dtype=np.float64).reshape(-1, 1, len(counts), 1)
+            disk_bits = sizes.reshape(1, -1, 1, 1) * factor
+            raw = disk_bits * counts.reshape(1, 1, -1, 1)
+            usable = disk_bits * data * (1 - reserves.reshape(1, 1, 1, -1))
+            shape = (len(geometries), len(sizes), len(counts), len(reserves))
+            grid = np.indices(shape).reshape(4, -1)
+            keep = np.broadcast_to(data, shape).reshape(-1) > 0
+            grid = grid[:, keep]
+            self.scheme_index = grid[0]
+            self.disk_sizes = sizes[grid[1]]
+            self.disks = counts[grid[2]]
+            self.reserves = reserves[grid[3]]
+            self.raw = np.broadcast_to(raw, shape).reshape(-1)[keep]
+            self.usable = np.broadcast_to(usable, shape).reshape(-1)[keep]
+            return
+        from array import array
+        self.scheme_index = array('I')
+        self.disk_sizes = array('d')
+        self.disks = array('q')
+        self.reserves = array('d')
+        self.raw = array('d')
+        self.usable = array('d')
+        for (scheme, geometry), size, count, reserve in product(
+                enumerate(geometries), disk_sizes, disk_counts, reserves):
+            data = _data_disks(count, geometry)
+            if data <= 0:
+                continue
+            self.scheme_index.append(scheme)
+            self.disk_sizes.append(size)
+            self.disks.append(count)
+            self.reserves.append(reserve)
+            self.raw.append(size * factor * count)
+            self.usable.append(size * factor * data * (1 - reserve))
+
+    def __len__(self):
+        return len(self.raw)
+
+    def column(self, name):
+        """ Look up a column by name (see COLUMNS); capacities are in bits
+
+        Output: NumPy array or array object
+        """
+        if name == 'overhead':
+            return self._combine(self.raw, self.usable, lambda a, b: a - b)
+        if name == 'efficiency':
+            return self._combine(self.usable, self.raw, lambda a, b: a / b)
+        if name not in COLUMNS:
+            raise ValueError('Invalid column: {0}'.format(name))
+        return getattr(self, name)
+
+    @staticmethod
+    def _combine(a, b, func):
+        if get_numpy() is not None:
+            return func(a, b)
+        from array import array
+        return array('d', map(func, a, b))
+
+    def _select(self, indexes):
+        grid = LayoutGrid.__new__(LayoutGrid)
+        grid.schemes = self.schemes
+        grid.disk_label = self.disk_label
+        for name in ('scheme_index', 'disk_sizes', 'disks', 'reserves',
+                     'raw', 'usable'):
+            setattr(grid, name, _take(getattr(self, name), indexes))
+        return grid
+
+    def sort(self, key='usable', reverse=True):
+        """ Order layouts by a column (stable)
+
+        Input:
+            - key: Column name (see COLUMNS)
+            - reverse: Largest first
+
+        Output: New LayoutGrid object
+        """
+        values = self.column(key)
+        np = get_numpy()
+        if np is not None:
+            indexes = np.argsort(-values if reverse else values,
+                                 kind='stable')
+        else:
+            indexes = sorted(range(len(values)), key=values.__getitem__,
+                             reverse=reverse)
+        return self._select(indexes)
+
+    def filter(self, min_usable=None, max_raw=None, min_efficiency=None,
+               max_disks=None, base=None):
+        """ Keep layouts meeting every given limit
+
+        Input:
+            - min_usable, max_raw: DataUnit objects, (value, label) tuples or
+                                   size strings (e.g.: '500 TiB')
+            - min_efficiency: Fraction of raw capacity that is usable
+            - max_disks: Largest disk count
+            - base: Optional base for ambiguous size labels (b/B)
+
+        Output: New LayoutGrid object
+        """
+        limits = []
+        if min_usable is not None:
+            limits.append(('usable', _to_bits(min_usable, base), 1))
+        if max_raw is not None:
+            limits.append(('raw', _to_bits(max_raw, base), -1))
+        if min_efficiency is not None:
+            limits.append(('efficiency', min_efficiency, 1))
+        if max_disks is not None:
+            limits.append(('disks', max_disks, -1))
+        np = get_numpy()
+        if np is not None:
+            keep = np.ones(len(self), dtype=bool)
+            for name, limit, sign in limits:
+                keep &= self.column(name) * sign >= limit * sign
+            return self._select(np.flatnonzero(keep))
+        columns = [(self.column(name), limit, sign)
+                   for name, limit, sign in limits]
+        return self._select([
+            index for index in range(len(self))
+            if all(column[index] * sign >= limit * sign
+                   for column, limit, sign in columns)])
+
+    def head(self, count):
+        """ Keep the first count layouts """
+        return self._select(range(min(count, len(self))))
+
+    def name(self, index):
+        """ Describe a layout (e.g.: '12x 20TB raid6 -5%') """
+        name = '{n}x {s}{ls} {sch}'.format(
+            n=int(self.disks[index]),
+            s=format_decimal_value(float(self.disk_sizes[index])),
+            ls=self.disk_label,
+            sch=self.schemes[self.scheme_index[index]])
+        if self.reserves[index]:
+            name += ' -{:g}%'.format(float(self.reserves[index]) * 100)
+        return name
+
+    def layout(self, index, label_short='TiB'):
+        """ Describe one layout with capacities at label_short
+
+        Output: Layout namedtuple; raw, usable and overhead are DataUnit
+                objects
+        """
+        raw = float(self.raw[index])
+        usable = float(self.usable[index])
+        return Layout(
+            self.schemes[self.scheme_index[index]],
+            DataUnit(float(self.disk_sizes[index]), self.disk_label),
+            int(self.disks[index]), float(self.reserves[index]),
+            DataUnit.from_bits(raw, label_short),
+            DataUnit.from_bits(usable, label_short),
+            DataUnit.from_bits(raw - usable, label_short), usable / raw)
+
+    def report(self, target_label='TiB', column='usable'):
+        """ Express one capacity column as DataUnits at target_label
+
+        Output: Tuple of (row label list, DataUnit list) for format_table;
+                row labels name each layout
+        """
+        values = self.column(column)
+        return ([self.name(index) for index in range(len(self))],
+                [DataUnit.from_bits(float(bits), target_label)
+                 for bits in values])
+
+
+def format_layouts(grid, label_short='TiB'):
+    """ Format layouts as a table of raw, usable and overhead capacity
+
+    Input:
+        - grid: LayoutGrid object
+        - label_short: Short unit label of capacities
+
+    Output: Table string
+    """
+    names = [grid.name(index) for index in range(len(grid))]
+    width = max([len(name) for name in names] + [6])
+    row = '| {n: <{w}} |{r: >16} |{u: >16} |{o: >16} |{e: >11} |'
+    header = row.format(
+        n='Layout', w=width, r='Raw ' + label_short,
+        u='Usable ' + label_short, o='Overhead ' + label_short,
+        e='Efficiency')
+    divider = format_table_divider(header)
+    lines = ['{}\n{}\n{}\n'.format(divider, header, divider)]
+    factor = label_to_bits_factor(label_short)
+    for index, name in enumerate(names):
+        raw = float(grid.raw[index])
+        usable = float(grid.usable[index])
+        lines.append(row.format(
+            n=name, w=width,
+            r=format_decimal_value(raw / factor),
+            u=format_decimal_value(usable / factor),
+            o=format_decimal_value((raw - usable) / factor),
+            e='{:.1f}%'.format(usable / raw * 100)) + '\n')
+    lines.append('{}\n'.format(divider))
+    return ''.join(lines)
+
+
+def parse_counts(text):
+    """ Expand comma separated counts and inclusive ranges
+
+    Input:
+        - text: String such as '8-12,16' or '4-24/4' (range with step)
+
+    Output: List of ints (e.g.: [8, 9, 10, 11, 12, 16]); raises ValueError
+            for malformed or empty ranges (e.g.: '10-5')
+    """
+    counts = []
+    for part in text.split(','):
+        span, _, step = part.partition('/')
+        first, _, last = span.partition('-')
+        try:
+            part_counts = range(int(first), int(last or first) + 1,
+                                int(step or 1))
+        except ValueError:
+            part_counts = None
+        if not part_counts:
+            raise ValueError('Invalid counts: {0}'.format(text))
+        counts.extend(part_counts)
+    return counts
+
+
+def parse_args(argv=None):
+    """ Parse layout subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc layout - usable capacity of RAID and erasure coding '
+    desc += 'layouts'
+    parser = new_parser(prog='bitcalc layout', description=desc)
+
+    # Argument: label (positional, optional)
+    help_str = 'specify short unit label of capacities (default: TiB)'
+    parser.add_argument('label', help=help_str, nargs='?', default='TiB')
+
+    # Argument: -s --disk-sizes (optional)
+    help_str = 'specify comma separated disk sizes (default: 20TB)'
+    parser.add_argument('-s', '--disk-sizes', help=help_str, default='20TB')
+
+    # Argument: -n --disks (optional)
+    help_str = 'specify comma separated disk counts or ranges '
+    help_str += '(e.g.: 8-24/4,36; default: 12)'
+    parser.add_argument('-n', '--disks', help=help_str, default='12')
+
+    # Argument: -l --layouts (optional)
+    help_str = 'specify comma separated schemes: raid0, raid5, raid6 '
+    help_str += '(optional :width groups), raid10, k+m '
+    help_str += '(default: raid6,raid10,8+3)'
+    parser.add_argument(
+        '-l', '--layouts', help=help_str, default='raid6,raid10,8+3')
+
+    # Argument: -r --reserve (optional)
+    help_str = 'specify comma separated filesystem reserve percentages '
+    help_str += '(default: 0)'
+    parser.add_argument('-r', '--reserve', help=help_str, default='0')
+
+    # Argument: --sort (optional)
+    help_str = 'specify sort column, largest first (default: usable)'
+    parser.add_argument(
+        '--sort', help=help_str, choices=COLUMNS, default='usable')
+
+    # Argument: --ascending (optional)
+    help_str = 'sort smallest first'
+    parser.add_argument('--ascending', help=help_str, action='store_true')
+
+    # Argument: --min-usable (optional)
+    help_str = 'hide layouts with less usable capacity (e.g.: 500TiB)'
+    parser.add_argument('--min-usable', help=help_str)
+
+    # Argument: --min-efficiency (optional)
+    help_str = 'hide layouts with a lower usable percentage of raw'
+    parser.add_argument('--min-efficiency', help=help_str, type=float)
+
+    # Argument: --limit (optional)
+    help_str = 'print at most this many layouts'
+    parser.add_argument('--limit', help=help_str, type=int)
+
+    args = parser.parse_args(argv)
+    validate_labels([args.label])
+    try:
+        sizes = [parse_quantity(size) for size in args.disk_sizes.split(',')]
+        args.disk_label = sizes[0][1]
+        args.disk_sizes = [
+            value * label_to_bits_factor(label_short)
+            / label_to_bits_factor(args.disk_label)
+            for value, label_short in sizes]
+        args.disks = parse_counts(args.disks)
+        args.layouts = args.layouts.split(',')
+        for scheme in args.layouts:
+            parse_scheme(scheme)
+        args.reserve = [float(reserve) / 100
+                        for reserve in args.reserve.split(',')]
+        if args.min_usable:
+            parse_quantity(args.min_usable)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if min(args.disks) < 1:
+        parser.error('disk counts must be positive')
+    if min(args.disk_sizes) <= 0:
+        parser.error('disk sizes must be positive')
+    if min(args.reserve) < 0 or max(args.reserve) >= 1:
+        parser.error('reserve must be at least 0 and below 100')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for layout subcommand invocation """
+    args = parse_args(argv)
+    grid = LayoutGrid(args.disk_sizes, args.disks, args.layouts,
+                      args.reserve, args.disk_label)
+    grid = grid.filter(
+        min_usable=args.min_usable,
+        min_efficiency=None if args.min_efficiency is None
+        else args.min_efficiency / 100)
+    grid = grid.sort(args.sort, reverse=not args.ascending)
+    if args.limit is not None:
+        grid = grid.head(args.limit)
+    if not len(grid):
+        sys.exit('error: no layouts match')
+    sys.stdout.write(format_layouts(grid, args.label))
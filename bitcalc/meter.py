@@ -0,0 +1,213 @@
+""" Pipe throughput meter: copy stdin to stdout and report the data rate
+
+Data is copied with readinto into one preallocated buffer, so the copy loop
+allocates nothing per chunk beyond a memoryview slice for short reads.
+Progress (amount, current rate, and percent complete and ETA when the
+expected size is known) is written to stderr by a reporter thread, so
+formatting never slows the copy.
+"""
+import os
+import sys
+import threading
+import time
+from .bits import DataUnit, DataRate
+from .interface import (new_parser, validate_labels, format_decimal_value,
+                        format_data_rate)
+from .parsing import parse_quantity
+
+# Default copy buffer size
+DEFAULT_BUFFER_SIZE = '1 MiB'
+
+
+def copy_stream(input_file, output_file, buffer_size, meter=None):
+    """ Copy input_file to output_file through a single reusable buffer
+
+    Input:
+        - input_file: Binary file object supporting readinto (ideally raw)
+        - output_file: Binary file object
+        - buffer_size: Copy buffer size in bytes
+        - meter: Optional Meter object whose byte count is updated per chunk
+
+    Output: Number of bytes copied
+    """
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    readinto = input_file.readinto
+    write = output_file.write
+    copied = 0
+    while True:
+        count = readinto(view)
+        if not count:
+            break
+        chunk = view if count == buffer_size else view[:count]
+        written = write(chunk)
+        while written is not None and written < count:
+            # Raw files may accept only part of a chunk
+            written += write(chunk[written:])
+        copied += count
+        if meter is not None:
+            meter.bytes = copied
+    return copied
+
+
+class Meter:
+    """ Periodic throughput reporter running on its own thread
+
+    The copy loop only stores a byte count; rates, percentages and ETAs are
+    computed and written on the reporter thread.
+    """
+    def __init__(self, label_short='MiB', total_bits=None, stream=sys.stderr,
+                 interval=1.0, clock=time.monotonic):
+        self.label_short = label_short
+        self.total_bits = total_bits
+        self.stream = stream
+        self.interval = interval
+        self.clock = clock
+        self.bytes = 0
+        self.started = None
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def data_rate(self, bits, seconds):
+        """ Express bits moved in seconds as a DataRate at label_short
+
+        Output: DataRate object, or None when nothing can be measured yet
+        """
+        if not bits or seconds <= 0:
+            return None
+        unit = DataUnit.from_bits(bits, self.label_short)
+        return DataRate(unit, rate=unit.value / seconds)
+
+    def format_progress(self, now):
+        """ Format a progress line from the current byte count
+
+        Output: String without line terminator
+        """
+        copied = self.bytes
+        last_time, last_bytes = self._last or (self.started, 0)
+        self._last = (now, copied)
+        bits = copied * 8
+        fields = ['{v} {ls}'.format(
+            v=format_decimal_value(DataUnit.from_bits(
+                bits, self.label_short).value),
+            ls=self.label_short)]
+        rate = self.data_rate((copied - last_bytes) * 8, now - last_time)
+        if rate is None:
+            rate = self.data_rate(bits, now - self.started)
+        if rate is not None:
+            fields.append(format_data_rate(rate))
+        if self.total_bits:
+            fields.append('{:0.1f}%'.format(
+                min(bits / self.total_bits, 1) * 100))
+            remaining = self.total_bits - bits
+            if rate is not None and remaining > 0:
+                # Duration of the remaining size at the current rate
+                eta = DataRate(
+                    DataUnit.from_bits(remaining, self.label_short),
+                    rate=rate.rate)
+                fields.append('ETA {}'.format(eta.duration.delta))
+        return '  '.join(fields)
+
+    def format_summary(self, now):
+        """ Format the final line reporting the total and average rate """
+        elapsed = now - self.started
+        rate = self.data_rate(self.bytes * 8, elapsed)
+        return 'Total: {v} {ls} in {t:0.3f} s{r}'.format(
+            v=format_decimal_value(DataUnit.from_bits(
+                self.bytes * 8, self.label_short).value),
+            ls=self.label_short,
+            t=elapsed,
+            r=' ({})'.format(format_data_rate(rate)) if rate else '')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.stream.write('\r{}\033[K'.format(
+                self.format_progress(self.clock())))
+            self.stream.flush()
+
+    def __enter__(self):
+        self.started = self.clock()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.stream.write('\r{}\033[K\n'.format(
+            self.format_summary(self.clock())))
+        self.stream.flush()
+
+
+def parse_args(argv=None):
+    """ Parse meter subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc meter - copy stdin to stdout and report the data rate '
+    desc += 'to stderr'
+    parser = new_parser(prog='bitcalc meter', description=desc)
+
+    # Argument: label (positional, optional)
+    help_str = 'specify short unit label of reported amounts and rates '
+    help_str += '(default: MiB)'
+    parser.add_argument('label', help=help_str, nargs='?', default='MiB')
+
+    # Argument: -s --size (optional)
+    help_str = 'specify expected total size for percent and ETA '
+    help_str += '(e.g.: 5GiB)'
+    parser.add_argument('-s', '--size', help=help_str)
+
+    # Argument: -i --interval (optional)
+    help_str = 'specify seconds between progress updates (default: 1)'
+    parser.add_argument(
+        '-i', '--interval', help=help_str, type=float, default=1.0)
+
+    # Argument: --buffer-size (optional)
+    help_str = 'specify copy buffer size (default: {})'.format(
+        DEFAULT_BUFFER_SIZE)
+    parser.add_argument(
+        '--buffer-size', help=help_str, default=DEFAULT_BUFFER_SIZE)
+
+    # Argument: -b --base (optional, only effective for b/B)
+    help_str = 'specify base for ambiguous unit labels in --size'
+    parser.add_argument(
+        '-b', '--base', help=help_str, type=int, choices=[2, 10])
+
+    args = parser.parse_args(argv)
+    validate_labels([args.label])
+    try:
+        args.total_bits = None
+        if args.size:
+            args.total_bits = DataUnit(
+                *parse_quantity(args.size), base=args.base).bits
+        args.buffer_bytes = int(DataUnit(
+            *parse_quantity(args.buffer_size)).bytes)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.buffer_bytes < 1:
+        parser.error('buffer size must be at least 1 byte')
+    if args.interval <= 0:
+        parser.error('interval must be positive')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for meter subcommand invocation """
+    args = parse_args(argv)
+    # Raw file objects avoid a second copy through Python's buffered layer
+    input_file = getattr(sys.stdin.buffer, 'raw', sys.stdin.buffer)
+    output_file = getattr(sys.stdout.buffer, 'raw', sys.stdout.buffer)
+    sys.stdout.flush()
+    try:
+        with Meter(args.label, args.total_bits,
+                   interval=args.interval) as meter:
+            copy_stream(input_file, output_file, args.buffer_bytes, meter)
+    except BrokenPipeError:
+        # Downstream reader exited (e.g.: head); silence the final flush
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,106 @@
+""" Parsing of free-form size and rate strings
+
+Sizes look like '5GiB', '1.5 TB' or '2e3 kB'; rates add a bits/bytes per
+second suffix ('10Gbps') or a time label ('37 MiB/s', '2 TB/day'). Every
+short label in DATA_LABEL_MAP and every time label in
+SHORT_TO_LONG_TIME_LABELS (short or long form) is recognized. Parsing is
+done by precompiled regular expressions; parse_quantities matches a whole
+batch with a single regex scan.
+"""
+import re
+from .bits import LABEL_INDEX
+from .time import SHORT_TO_LONG_TIME_LABELS
+
+# Long form time labels (singular and plural) and common abbreviations to
+# short time label; '10/sec', '10/min' and '10/hr' were accepted by --rate
+# before this parser existed
+TIME_LABEL_ALIASES = {
+    'sec': 's', 'secs': 's', 'min': 'm', 'mins': 'm', 'hr': 'h', 'hrs': 'h',
+    'wk': 'w', 'wks': 'w', 'yr': 'y', 'yrs': 'y',
+}
+for _short, _long in SHORT_TO_LONG_TIME_LABELS.items():
+    TIME_LABEL_ALIASES[_short] = _short
+    TIME_LABEL_ALIASES[_long] = _short
+    TIME_LABEL_ALIASES[_long[:-1]] = _short
+del _short, _long
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+# Longest labels first so that e.g. 'GiB' is never matched as 'Gi' + 'B'
+_LABEL = '|'.join(sorted(map(re.escape, LABEL_INDEX), key=len, reverse=True))
+_TIME = '|'.join(sorted(TIME_LABEL_ALIASES, key=len, reverse=True))
+
+QUANTITY_PATTERN = re.compile(
+    r'[ \t]*({n})[ \t]*({l})[ \t]*$'.format(n=_NUMBER, l=_LABEL))
+
+RATE_PATTERN = re.compile(
+    r'[ \t]*({n})[ \t]*(?:({l})(?:(ps)|[ \t]*/[ \t]*({t}))?|/[ \t]*({t}))?'
+    r'[ \t]*$'.format(n=_NUMBER, l=_LABEL, t=_TIME))
+
+# Batch form of QUANTITY_PATTERN matching one quantity per line
+_QUANTITY_LINES_PATTERN = re.compile(
+    r'^[ \t]*({n})[ \t]*({l})[ \t]*$'.format(n=_NUMBER, l=_LABEL),
+    re.MULTILINE)
+
+
+def parse_quantity(text):
+    """ Split a size string into value and short label
+
+    Input:
+        - text: String such as '5GiB', '1.5 TB' or ' 42 b '
+
+    Output: Tuple of (float value, short label string); raises ValueError
+            for strings that are not a number followed by a known label
+    """
+    match = QUANTITY_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError('Invalid quantity: {0}'.format(text))
+    return float(match.group(1)), match.group(2)
+
+
+def parse_rate(text, time_label_short='s'):
+    """ Split a rate string into value, short label and short time label
+
+    Input:
+        - text: String such as '10Gbps', '37 MiB/s', '2 TB/day' or '37/s'
+        - time_label_short: Time label used when text has none (e.g.: '37',
+                            '5 GiB')
+
+    Output: Tuple of (float value, short label string or None when text has
+            no data label, short time label); raises ValueError for
+            unrecognized strings
+    """
+    match = RATE_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError('Invalid rate: {0}'.format(text))
+    value, label, per_second, time_label, bare_time_label = match.groups()
+    time_label = time_label or bare_time_label
+    if per_second:
+        time_label_short = 's'
+    elif time_label:
+        time_label_short = TIME_LABEL_ALIASES[time_label]
+    return float(value), label, time_label_short
+
+
+def parse_quantities(texts):
+    """ Parse many single line size strings with one regex scan
+
+    Input:
+        - texts: Sequence of size strings (see parse_quantity)
+
+    Output: Tuple of (array('d') of values, list of short labels), ordered
+            as texts; raises ValueError naming the first invalid string
+    """
+    from array import array
+    texts = list(texts)
+    if not texts:
+        return array('d'), []
+    text = '\n'.join(texts)
+    matches = _QUANTITY_LINES_PATTERN.findall(text)
+    if len(matches) != len(texts) or text.count('\n') != len(texts) - 1:
+        # Locate the offending string for the error message
+        for item in texts:
+            parse_quantity(item)
+        raise ValueError('Quantities must not contain line breaks')
+    values, labels = zip(*matches)
+    return array('d', map(float, values)), list(labels)
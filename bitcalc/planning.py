@@ -0,0 +1,149 @@
+""" Batch transfer planning: durations from sizes and rates, and the reverse
+
+All functions accept NumPy arrays, buffers, sequences or scalars and never
+go through timestamp strings. NumPy arrays are returned when NumPy is
+installed, otherwise array('d') objects.
+"""
+from .bits import label_to_bits_factor
+from .compat import get_numpy
+from .time import SHORT_TO_LONG_TIME_LABELS, TIME_UNITS_TO_SECONDS
+
+
+def time_label_to_seconds(time_label_short):
+    """ Identify the number of seconds in one unit of time_label_short
+
+    Input:
+        - time_label_short: Short time label (s, m, h, d, w, y)
+
+    Output: Integer seconds
+    """
+    return TIME_UNITS_TO_SECONDS[SHORT_TO_LONG_TIME_LABELS[time_label_short]]
+
+
+def as_values(values):
+    """ Convert scalar or sequence input to a float array
+
+    Input:
+        - values: Scalar, NumPy array, buffer, or sequence of numbers or
+                  timedelta objects (converted to seconds)
+
+    Output: NumPy float64 array or array('d')
+    """
+    from array import array
+    np = get_numpy()
+    if isinstance(values, (int, float)):
+        values = [values]
+    elif hasattr(values, 'total_seconds'):
+        values = [values.total_seconds()]
+    elif not isinstance(values, (array, memoryview)) and (
+            np is None or not isinstance(values, np.ndarray)):
+        values = [
+            v.total_seconds() if hasattr(v, 'total_seconds') else v
+            for v in values]
+    if np is not None:
+        return np.asarray(values, dtype=np.float64)
+    return values if isinstance(values, array) else array('d', values)
+
+
+def combine(a, b, func):
+    """ Apply func elementwise over a and b, broadcasting length 1 inputs
+
+    Input:
+        - a, b: Arrays from as_values
+        - func: Callable taking two floats (or two NumPy arrays)
+
+    Output: NumPy array or array('d')
+    """
+    if get_numpy() is not None:
+        return func(a, b)
+    from array import array
+    if len(a) == 1 and len(b) != 1:
+        a = a * len(b)
+    elif len(b) == 1 and len(a) != 1:
+        b = b * len(a)
+    elif len(a) != len(b):
+        raise ValueError('operands could not be broadcast together')
+    return array('d', map(func, a, b))
+
+
+def to_timedeltas(seconds):
+    """ Convert an array of seconds to a list of timedelta objects
+
+    Input:
+        - seconds: Iterable of float seconds
+
+    Output: List of datetime.timedelta objects
+    """
+    from datetime import timedelta
+    return [timedelta(seconds=float(s)) for s in seconds]
+
+
+def solve_durations(sizes, size_label, rates, rate_label,
+                    time_label_short='s', as_timedelta=False, base=None):
+    """ Calculate transfer durations for many sizes and rates
+
+    Input:
+        - sizes: Transfer sizes at size_label (scalar or array)
+        - size_label: Short unit label of sizes
+        - rates: Link rates at rate_label per time_label_short (scalar or
+                 array; broadcast against sizes)
+        - rate_label: Short unit label of rates (e.g.: 'Gb' for Gb/s)
+        - time_label_short: Time label of rates (s, m, h, d, w, y)
+        - as_timedelta: Return timedelta objects instead of seconds
+        - base: Optional base for ambiguous size_label (b/B)
+
+    Output: Array of durations in seconds, or list of timedelta objects
+    """
+    size_bits = label_to_bits_factor(size_label, base=base)
+    rate_bits = label_to_bits_factor(rate_label) / time_label_to_seconds(
+        time_label_short)
+    scale = size_bits / rate_bits
+    seconds = combine(
+        as_values(sizes), as_values(rates),
+        lambda size, rate: size * scale / rate)
+    return to_timedeltas(seconds) if as_timedelta else seconds
+
+
+def solve_rates(sizes, size_label, durations, rate_label,
+                time_label_short='s', base=None):
+    """ Calculate the rates required to move many sizes within durations
+
+    Input:
+        - sizes: Transfer sizes at size_label (scalar or array)
+        - size_label: Short unit label of sizes
+        - durations: Durations in seconds or timedelta objects (scalar or
+                     array; broadcast against sizes)
+        - rate_label: Short unit label of returned rates
+        - time_label_short: Time label of returned rates (s, m, h, d, w, y)
+        - base: Optional base for ambiguous size_label (b/B)
+
+    Output: Array of rates at rate_label per time_label_short
+    """
+    scale = (label_to_bits_factor(size_label, base=base)
+             / label_to_bits_factor(rate_label)
+             * time_label_to_seconds(time_label_short))
+    return combine(
+        as_values(sizes), as_values(durations),
+        lambda size, seconds: size * scale / seconds)
+
+
+def solve_sizes(rates, rate_label, durations, size_label,
+                time_label_short='s'):
+    """ Calculate the sizes moved by many rates over durations
+
+    Input:
+        - rates: Link rates at rate_label per time_label_short
+        - rate_label: Short unit label of rates
+        - durations: Durations in seconds or timedelta objects (broadcast
+                     against rates)
+        - size_label: Short unit label of returned sizes
+        - time_label_short: Time label of rates (s, m, h, d, w, y)
+
+    Output: Array of sizes at size_label
+    """
+    scale = (label_to_bits_factor(rate_label)
+             / time_label_to_seconds(time_label_short)
+             / label_to_bits_factor(size_label))
+    return combine(
+        as_values(rates), as_values(durations),
+        lambda rate, seconds: rate * scale * seconds)
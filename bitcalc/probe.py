@@ -0,0 +1,325 @@
+""" Local storage throughput probe reporting in bitcalc units
+
+Sequential and random reads and writes are issued with os.preadv/os.pwrite
+from a thread pool (the queue depth). Every worker reuses one page-aligned
+anonymous mmap buffer, so buffers also satisfy O_DIRECT alignment (--direct)
+and nothing is allocated per block. Written data is flushed with fsync and
+dropped from the page cache before reads so reads hit the device.
+
+Probing a directory uses a temporary file that is removed afterwards.
+Existing files and block devices are only written with --write.
+"""
+import mmap
+import os
+import random
+import stat
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from .bits import DataUnit, DataRate, label_to_bits_factor
+from .interface import (new_parser, validate_labels, format_decimal_value,
+                        format_rate_value)
+from .parsing import parse_quantity
+
+# Test name to (access pattern, writes data)
+TESTS = {
+    'write': ('sequential', True),
+    'read': ('sequential', False),
+    'randwrite': ('random', True),
+    'randread': ('random', False),
+}
+
+# Default test order; writes come first so reads have data
+DEFAULT_TESTS = 'write,read,randread,randwrite'
+
+DEFAULT_BLOCK_SIZE = '1 MiB'
+DEFAULT_SIZE = '256 MiB'
+
+
+def block_offsets(size, block_size, pattern='sequential', seed=0):
+    """ List block offsets covering size bytes
+
+    Input:
+        - size: Bytes to cover (rounded down to whole blocks)
+        - block_size: Bytes per block
+        - pattern: 'sequential' or 'random' (shuffled, each block once)
+        - seed: Random seed for the random pattern
+
+    Output: List of byte offsets
+    """
+    offsets = list(range(0, size - size % block_size, block_size))
+    if pattern == 'random':
+        random.Random(seed).shuffle(offsets)
+    return offsets
+
+
+def _transfer(fd, offsets, block_size, write):
+    """ Read or write one block at each offset through a reusable buffer
+
+    Output: Number of bytes transferred
+    """
+    buffer = mmap.mmap(-1, block_size)
+    try:
+        if write:
+            buffer.write(os.urandom(block_size))
+        buffers = [buffer]
+        transferred = 0
+        for offset in offsets:
+            if write:
+                transferred += os.pwrite(fd, buffer, offset)
+            else:
+                transferred += os.preadv(fd, buffers, offset)
+        return transferred
+    finally:
+        buffer.close()
+
+
+def drop_cache(fd):
+    """ Flush fd and ask the kernel to drop its cached pages """
+    os.fsync(fd)
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def run_test(fd, size, block_size, pattern, write, queue_depth=1, seed=0):
+    """ Time one read or write pass over size bytes of fd
+
+    Input:
+        - fd: Open file descriptor
+        - size: Bytes to transfer
+        - block_size: Bytes per request
+        - pattern: 'sequential' or 'random'
+        - write: Write instead of read
+        - queue_depth: Number of concurrent requests (worker threads)
+        - seed: Random seed for the random pattern
+
+    Output: Tuple of (bytes transferred, seconds)
+    """
+    offsets = block_offsets(size, block_size, pattern, seed)
+    with ThreadPoolExecutor(max_workers=queue_depth) as executor:
+        start = perf_counter()
+        futures = [
+            executor.submit(_transfer, fd, offsets[worker::queue_depth],
+                            block_size, write)
+            for worker in range(queue_depth)]
+        transferred = sum(future.result() for future in futures)
+        if write:
+            # Data is only written once it reaches the device
+            os.fsync(fd)
+        seconds = perf_counter() - start
+    drop_cache(fd)
+    return transferred, seconds
+
+
+def measured_rate(transferred, seconds, label_short='MiB'):
+    """ Express a measurement as a DataRate per second at label_short
+
+    Input:
+        - transferred: Bytes transferred
+        - seconds: Seconds taken
+        - label_short: Short unit label of the rate
+
+    Output: DataRate object
+    """
+    unit = DataUnit.from_bits(transferred * 8, label_short)
+    return DataRate(unit, rate=unit.value / seconds)
+
+
+def format_result(name, transferred, seconds, label_short='MiB',
+                  estimate=None):
+    """ Format one test result line
+
+    Input:
+        - name: Test name
+        - transferred, seconds: Output of run_test
+        - label_short: Short unit label of the rate
+        - estimate: Optional DataUnit whose transfer duration at the
+                    measured rate is reported
+
+    Output: String without line terminator
+    """
+    line = '{n: <10} {r: >20}'.format(
+        n=name, r=format_rate_value(
+            measured_rate(transferred, seconds, label_short)))
+    if estimate is not None:
+        # Measured rate expressed in the estimate's own label
+        rate = transferred * 8 / seconds / label_to_bits_factor(
+            estimate.label_short, base=estimate.base)
+        line += '  ({v} {ls} in {d})'.format(
+            v=format_decimal_value(estimate.value),
+            ls=estimate.label_short,
+            d=DataRate(estimate, rate=rate).duration.delta)
+    return line
+
+
+def open_target(path, size, allow_write):
+    """ Open the probe target, creating a temporary file for directories
+
+    Input:
+        - path: Directory, regular file or block device
+        - size: Requested probe size in bytes
+        - allow_write: Whether existing files and devices may be written
+
+    Output: Tuple of (file descriptor, bytes available to probe, writable,
+            temporary file path or None, original size of a file extended to
+            size or None); extended files hold holes past their original size
+    """
+    if os.path.isdir(path):
+        fd, temp_path = tempfile.mkstemp(prefix='bitcalc-probe-', dir=path)
+        try:
+            os.ftruncate(fd, size)
+        except BaseException:
+            os.close(fd)
+            os.unlink(temp_path)
+            raise
+        return fd, size, True, temp_path, None
+    mode = os.stat(path).st_mode
+    if not (stat.S_ISREG(mode) or stat.S_ISBLK(mode)):
+        raise ValueError('not a directory, file or block device: {0}'.format(
+            path))
+    fd = os.open(path, os.O_RDWR if allow_write else os.O_RDONLY)
+    try:
+        available = os.lseek(fd, 0, os.SEEK_END)
+        if stat.S_ISREG(mode) and allow_write and available < size:
+            os.ftruncate(fd, size)
+            return fd, size, True, None, available
+    except BaseException:
+        # The caller only closes descriptors that were returned
+        os.close(fd)
+        raise
+    return fd, min(size, available), allow_write, None, None
+
+
+def parse_args(argv=None):
+    """ Parse probe subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc probe - measure storage read/write throughput'
+    parser = new_parser(prog='bitcalc probe', description=desc)
+
+    # Argument: path (positional, required)
+    help_str = 'specify directory (temporary file), file or block device'
+    parser.add_argument('path', help=help_str)
+
+    # Argument: label (positional, optional)
+    help_str = 'specify short unit label of rates (default: MiB)'
+    parser.add_argument('label', help=help_str, nargs='?', default='MiB')
+
+    # Argument: -s --size (optional)
+    help_str = 'specify bytes probed per test (default: {})'.format(
+        DEFAULT_SIZE)
+    parser.add_argument('-s', '--size', help=help_str, default=DEFAULT_SIZE)
+
+    # Argument: --block-size (optional)
+    help_str = 'specify request size (default: {})'.format(
+        DEFAULT_BLOCK_SIZE)
+    parser.add_argument(
+        '--block-size', help=help_str, default=DEFAULT_BLOCK_SIZE)
+
+    # Argument: -q --queue-depth (optional)
+    help_str = 'specify concurrent requests (default: 1)'
+    parser.add_argument(
+        '-q', '--queue-depth', help=help_str, type=int, default=1)
+
+    # Argument: -t --tests (optional)
+    help_str = 'specify comma separated tests (default: {})'.format(
+        DEFAULT_TESTS)
+    parser.add_argument('-t', '--tests', help=help_str, default=DEFAULT_TESTS)
+
+    # Argument: -e --estimate (optional)
+    help_str = 'report the duration of moving this size at each rate '
+    help_str += '(e.g.: 5TiB)'
+    parser.add_argument('-e', '--estimate', help=help_str)
+
+    # Argument: --write (optional)
+    help_str = 'allow writes to an existing file or block device '
+    help_str += '(destroys its data)'
+    parser.add_argument('--write', help=help_str, action='store_true')
+
+    # Argument: --direct (optional)
+    help_str = 'bypass the page cache with O_DIRECT'
+    parser.add_argument('--direct', help=help_str, action='store_true')
+
+    args = parser.parse_args(argv)
+    validate_labels([args.label])
+    try:
+        args.size_bytes = int(DataUnit(*parse_quantity(args.size)).bytes)
+        args.block_bytes = int(DataUnit(
+            *parse_quantity(args.block_size)).bytes)
+        args.estimate_unit = None
+        if args.estimate:
+            args.estimate_unit = DataUnit(*parse_quantity(args.estimate))
+    except ValueError as exc:
+        parser.error(str(exc))
+    args.tests = args.tests.split(',')
+    for test in args.tests:
+        if test not in TESTS:
+            parser.error('unknown test: {}'.format(test))
+    if args.size_bytes < 1:
+        parser.error('size must be positive')
+    if args.block_bytes < 1:
+        parser.error('block size must be positive')
+    if args.size_bytes < args.block_bytes:
+        parser.error('size must be at least one block ({} bytes)'.format(
+            args.block_bytes))
+    if args.direct and args.block_bytes % mmap.PAGESIZE:
+        parser.error('--direct needs a block size multiple of {}'.format(
+            mmap.PAGESIZE))
+    if args.queue_depth < 1:
+        parser.error('queue depth must be at least 1')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for probe subcommand invocation """
+    args = parse_args(argv)
+    temp_path = None
+    try:
+        fd, size, writable, temp_path, original_size = open_target(
+            args.path, args.size_bytes, args.write)
+        try:
+            if size < args.block_bytes:
+                raise ValueError('{} holds less than one block'.format(
+                    args.path))
+            if args.direct:
+                import fcntl
+                flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+                fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_DIRECT)
+            if (temp_path or original_size is not None) and \
+                    not TESTS[args.tests[0]][1]:
+                # A read comes before any write; fill the holes so reads
+                # return real blocks
+                run_test(fd, size, args.block_bytes, 'sequential', True)
+            print('Probe: {p} ({v} {ls}, {b} byte blocks, queue depth '
+                  '{q})'.format(
+                      p=args.path,
+                      v=format_decimal_value(
+                          DataUnit.from_bits(size * 8, args.label).value),
+                      ls=args.label, b=args.block_bytes, q=args.queue_depth))
+            for test in args.tests:
+                pattern, write = TESTS[test]
+                if write and not writable:
+                    print('{: <10} skipped (use --write)'.format(test))
+                    continue
+                transferred, seconds = run_test(
+                    fd, size, args.block_bytes, pattern, write,
+                    args.queue_depth)
+                print(format_result(test, transferred, seconds, args.label,
+                                    args.estimate_unit))
+        finally:
+            if original_size is not None:
+                # Leave an extended file at its original size
+                os.ftruncate(fd, original_size)
+            os.close(fd)
+    except OSError as exc:
+        sys.exit('error: {}'.format(exc))
+    except ValueError as exc:
+        sys.exit('error: {}'.format(exc))
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
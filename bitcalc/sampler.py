@@ -0,0 +1,332 @@
+""" Rolling data rates from Linux interface and block device counters
+
+Byte counters are read from /proc/net/dev (received/transmitted) and
+/proc/diskstats (sectors read/written) at a fixed interval. Per-interval
+deltas are kept in a fixed-size, array-backed ring buffer, so sampling
+allocates no per-sample objects and rolling rates over any window up to the
+ring length are sums over contiguous slices. Counter wraparound (32-bit
+counters) is handled when deltas are taken.
+"""
+import sys
+import time
+from array import array
+from .bits import DataUnit, DataRate
+from .interface import new_parser, validate_labels, format_rate_value
+from .planning import time_label_to_seconds
+
+NET_DEV_PATH = '/proc/net/dev'
+DISKSTATS_PATH = '/proc/diskstats'
+
+# Bytes per sector in /proc/diskstats (fixed by the kernel)
+SECTOR_BYTES = 512
+
+# Counter sources selectable on the command line
+SOURCES = ('net', 'disk', 'all')
+
+# Default rolling windows in seconds
+DEFAULT_WINDOWS = '1,10,60'
+
+
+def read_net_dev(path=NET_DEV_PATH):
+    """ Read received and transmitted byte counters per network interface
+
+    Input:
+        - path: Path of a /proc/net/dev formatted file
+
+    Output: List of (counter name, bytes) tuples (e.g.: ('eth0 rx', 1188))
+    """
+    counters = []
+    with open(path) as net_dev:
+        lines = net_dev.read().splitlines()
+    for line in lines[2:]:
+        device, _, data = line.partition(':')
+        fields = data.split()
+        device = device.strip()
+        counters.append((device + ' rx', int(fields[0])))
+        counters.append((device + ' tx', int(fields[8])))
+    return counters
+
+
+def read_diskstats(path=DISKSTATS_PATH):
+    """ Read read and written byte counters per block device
+
+    Input:
+        - path: Path of a /proc/diskstats formatted file
+
+    Output: List of (counter name, bytes) tuples (e.g.: ('sda read', 512))
+    """
+    counters = []
+    with open(path) as diskstats:
+        lines = diskstats.read().splitlines()
+    for line in lines:
+        fields = line.split()
+        counters.append((fields[2] + ' read', int(fields[5]) * SECTOR_BYTES))
+        counters.append((fields[2] + ' write', int(fields[9]) * SECTOR_BYTES))
+    return counters
+
+
+def read_counters(source='net', devices=None):
+    """ Read byte counters from source, optionally limited to devices
+
+    Input:
+        - source: One of SOURCES
+        - devices: Optional collection of device names to keep
+
+    Output: List of (counter name, bytes) tuples
+    """
+    if source not in SOURCES:
+        raise ValueError('Invalid source: {0}'.format(source))
+    counters = []
+    if source in ('net', 'all'):
+        counters.extend(read_net_dev())
+    if source in ('disk', 'all'):
+        counters.extend(read_diskstats())
+    if devices:
+        counters = [
+            counter for counter in counters
+            if counter[0].rpartition(' ')[0] in devices]
+    return counters
+
+
+class CounterRing:
+    """ Fixed-size ring of per-interval counter deltas
+
+    Deltas are stored counter-major in one array('Q'), so the deltas of a
+    counter over consecutive samples are contiguous.
+    """
+    def __init__(self, names, values, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.names = tuple(names)
+        self.capacity = capacity
+        self.last = array('Q', values)
+        self.deltas = array('Q', bytes(8 * capacity * len(self.names)))
+        self.intervals = array('d', bytes(8 * capacity))
+        self.position = 0
+        self.filled = 0
+
+    def add(self, values, elapsed):
+        """ Record counter values read elapsed seconds after the last ones
+
+        Input:
+            - values: Counter values ordered as names
+            - elapsed: Seconds since the previous sample
+        """
+        capacity = self.capacity
+        position = self.position
+        last = self.last
+        deltas = self.deltas
+        for index, value in enumerate(values):
+            previous = last[index]
+            delta = value - previous
+            if delta < 0:
+                # 32-bit counters wrap; anything else was reset to zero
+                delta = value + 2**32 - previous if previous < 2**32 else value
+            deltas[index * capacity + position] = delta
+            last[index] = value
+        self.intervals[position] = elapsed
+        self.position = (position + 1) % capacity
+        self.filled = min(self.filled + 1, capacity)
+
+    def _window_slices(self, samples):
+        samples = min(samples, self.filled)
+        end = self.position
+        start = end - samples
+        if start >= 0:
+            return samples, ((start, end),)
+        return samples, ((start + self.capacity, self.capacity), (0, end))
+
+    def window(self, samples):
+        """ Sum the most recent samples
+
+        Input:
+            - samples: Number of most recent samples to sum (capped at the
+                       number recorded)
+
+        Output: Tuple of (seconds covered, list of byte totals ordered as
+                names)
+        """
+        samples, slices = self._window_slices(samples)
+        if not samples:
+            return 0.0, [0] * len(self.names)
+        seconds = sum(
+            sum(self.intervals[start:end]) for start, end in slices)
+        capacity = self.capacity
+        deltas = self.deltas
+        totals = []
+        for index in range(len(self.names)):
+            offset = index * capacity
+            totals.append(sum(
+                sum(deltas[offset + start:offset + end])
+                for start, end in slices))
+        return seconds, totals
+
+
+class Sampler:
+    """ Sample counters at a fixed interval into a CounterRing """
+    def __init__(self, source='net', devices=None, interval=1.0,
+                 max_window=60.0, clock=time.monotonic):
+        self.source = source
+        self.devices = devices
+        self.interval = interval
+        self.clock = clock
+        self.capacity = max(int(round(max_window / interval)), 1)
+        self.ring = None
+        self._last_time = None
+
+    def sample(self):
+        """ Read counters once and record them """
+        now = self.clock()
+        counters = read_counters(self.source, self.devices)
+        names = [name for name, _ in counters]
+        values = [value for _, value in counters]
+        if self.ring is None or tuple(names) != self.ring.names:
+            # Devices appeared or disappeared; rates restart from here
+            self.ring = CounterRing(names, values, self.capacity)
+        else:
+            self.ring.add(values, now - self._last_time)
+        self._last_time = now
+
+    def rates(self, window, label_short='MiB', time_label_short='s'):
+        """ Calculate rates of every counter over the last window seconds
+
+        Input:
+            - window: Window length in seconds
+            - label_short: Short unit label of rates
+            - time_label_short: Short time label of rates
+
+        Output: List of (counter name, DataRate or None) tuples; None when
+                no interval has been recorded yet
+        """
+        samples = max(int(round(window / self.interval)), 1)
+        seconds, totals = self.ring.window(samples)
+        time_seconds = time_label_to_seconds(time_label_short)
+        rates = []
+        for name, total in zip(self.ring.names, totals):
+            if not seconds:
+                rates.append((name, None))
+                continue
+            unit = DataUnit.from_bits(total * 8, label_short)
+            # The constructor cannot derive a duration from the zero rate
+            # of an idle counter, so give both
+            rates.append((name, DataRate.from_rate(
+                unit, unit.value / seconds * time_seconds, seconds,
+                time_label_short=time_label_short)))
+        return rates
+
+    def run(self, delay):
+        """ Sample at the fixed interval for delay seconds """
+        deadline = self.clock() + delay
+        while True:
+            next_sample = self._last_time + self.interval
+            if next_sample > deadline:
+                break
+            time.sleep(max(next_sample - self.clock(), 0))
+            self.sample()
+        time.sleep(max(deadline - self.clock(), 0))
+
+
+def format_rates(sampler, windows, label_short='MiB', time_label_short='s'):
+    """ Format rolling rates of every counter as text columns
+
+    Input:
+        - sampler: Sampler object
+        - windows: Window lengths in seconds
+        - label_short: Short unit label of rates
+        - time_label_short: Short time label of rates
+
+    Output: String with a header line and one line per counter
+    """
+    columns = [sampler.rates(window, label_short, time_label_short)
+               for window in windows]
+    width = max([len(name) for name in sampler.ring.names] + [7])
+    lines = ['{n: <{w}}{c}\n'.format(
+        n='counter', w=width,
+        c=''.join('{: >20}'.format('{:g}s'.format(window))
+                  for window in windows))]
+    for row in zip(*columns):
+        lines.append('{n: <{w}}{c}\n'.format(
+            n=row[0][0], w=width,
+            c=''.join('{: >20}'.format(
+                format_rate_value(rate) if rate else '-')
+                for _, rate in row)))
+    return ''.join(lines)
+
+
+def parse_args(argv=None):
+    """ Parse rate subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc rate - rolling data rates of network interfaces and '
+    desc += 'block devices'
+    parser = new_parser(prog='bitcalc rate', description=desc)
+
+    # Argument: devices (positional, optional, multiple allowed)
+    help_str = 'specify device name(s) to report (default: all)'
+    parser.add_argument('devices', help=help_str, nargs='*')
+
+    # Argument: -s --source (optional)
+    help_str = 'specify counter source (default: net)'
+    parser.add_argument(
+        '-s', '--source', help=help_str, choices=SOURCES, default='net')
+
+    # Argument: -l --label (optional)
+    help_str = 'specify short unit label of rates (default: MiB)'
+    parser.add_argument('-l', '--label', help=help_str, default='MiB')
+
+    # Argument: -i --interval (optional)
+    help_str = 'specify seconds between samples (default: 1)'
+    parser.add_argument(
+        '-i', '--interval', help=help_str, type=float, default=1.0)
+
+    # Argument: -w --windows (optional)
+    help_str = 'specify comma separated rolling windows in seconds '
+    help_str += '(default: {})'.format(DEFAULT_WINDOWS)
+    parser.add_argument('-w', '--windows', help=help_str,
+                        default=DEFAULT_WINDOWS)
+
+    # Argument: -r --report (optional)
+    help_str = 'specify seconds between reports (default: 1)'
+    parser.add_argument(
+        '-r', '--report', help=help_str, type=float, default=1.0)
+
+    # Argument: -c --count (optional)
+    help_str = 'stop after this many reports (default: run until '
+    help_str += 'interrupted)'
+    parser.add_argument('-c', '--count', help=help_str, type=int)
+
+    args = parser.parse_args(argv)
+    validate_labels([args.label])
+    try:
+        args.windows = [float(window) for window in args.windows.split(',')]
+    except ValueError:
+        parser.error('invalid windows: {}'.format(args.windows))
+    if args.interval <= 0 or args.report <= 0 or min(args.windows) <= 0:
+        parser.error('interval, report and windows must be positive')
+    if args.report < args.interval:
+        parser.error('report must not be shorter than interval')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for rate subcommand invocation """
+    args = parse_args(argv)
+    sampler = Sampler(args.source, set(args.devices), args.interval,
+                      max(args.windows))
+    try:
+        sampler.sample()
+        reports = 0
+        while args.count is None or reports < args.count:
+            sampler.run(args.report)
+            sys.stdout.write('\n' + format_rates(
+                sampler, args.windows, args.label))
+            sys.stdout.flush()
+            reports += 1
+    except OSError as exc:
+        sys.exit('error: {}'.format(exc))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,238 @@
+""" Parallel directory size scanner reporting in bitcalc units
+
+Directories are listed with os.scandir on a thread pool, which overlaps the
+I/O latency of network mounts. Sizes are apparent file sizes (st_size) and
+symbolic links are not followed.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+from .bits import DataUnit
+from .interface import (LABELS_B2, new_parser, validate_labels,
+                        format_decimal_value, format_table,
+                        generate_data_unit_list)
+
+
+class ScanResult:
+    """ Totals gathered by a directory tree scan """
+    def __init__(self, root):
+        self.root = root
+        self.own_bytes = {}
+        self.children = {}
+        self.depths = {}
+        self.files = 0
+        self.directories = 0
+        self.errors = 0
+
+    def totals(self):
+        """ Roll directory sizes up into their ancestors
+
+        Output: Dictionary of directory path: total bytes (recursive)
+        """
+        totals = {}
+        # Deepest directories first so children are summed before parents
+        for path in sorted(self.depths, key=self.depths.get, reverse=True):
+            totals[path] = self.own_bytes.get(path, 0) + sum(
+                totals[child] for child in self.children.get(path, ()))
+        return totals
+
+
+def scan_directory(path):
+    """ List one directory without recursing
+
+    Input:
+        - path: Directory path to list
+
+    Output: Tuple of (path, bytes of files, file count, subdirectory paths,
+            error flag)
+    """
+    size = 0
+    files = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    continue
+    except OSError:
+        return path, size, files, subdirs, True
+    return path, size, files, subdirs, False
+
+
+def scan_tree(root, workers=8, progress=None):
+    """ Scan a directory tree concurrently
+
+    Input:
+        - root: Directory path to scan
+        - workers: Number of scanning threads
+        - progress: Optional ScanProgress object updated as directories
+                    complete
+
+    Output: ScanResult object
+    """
+    result = ScanResult(root)
+    result.depths[root] = 0
+    completed = SimpleQueue()
+
+    def submit(executor, path):
+        future = executor.submit(scan_directory, path)
+        future.add_done_callback(completed.put)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        submit(executor, root)
+        outstanding = 1
+        while outstanding:
+            # Completed listings arrive in any order; only this thread
+            # touches result, so no locking is needed
+            path, size, files, subdirs, error = completed.get().result()
+            outstanding -= 1
+            depth = result.depths[path]
+            result.own_bytes[path] = size
+            result.children[path] = subdirs
+            result.files += files
+            result.directories += 1
+            result.errors += error
+            for subdir in subdirs:
+                result.depths[subdir] = depth + 1
+                submit(executor, subdir)
+            outstanding += len(subdirs)
+            if progress is not None:
+                progress.update(result, outstanding)
+    return result
+
+
+class ScanProgress:
+    """ Periodic progress reporter running on its own thread
+
+    The scanning loop only stores counters; formatting and writing happen on
+    the reporter thread so progress output never blocks the walk.
+    """
+    def __init__(self, stream=sys.stderr, interval=0.5):
+        self.stream = stream
+        self.interval = interval
+        self.directories = 0
+        self.files = 0
+        self.pending = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def update(self, result, pending):
+        self.directories = result.directories
+        self.files = result.files
+        self.pending = pending
+
+    def _write(self, end=''):
+        self.stream.write(
+            '\rscanned {d} directories, {f} files ({p} queued){e}'.format(
+                d=self.directories, f=self.files, p=self.pending, e=end))
+        self.stream.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._write(end='\n')
+
+
+def format_scan(result, target_labels, max_depth=0):
+    """ Format scan totals for command line output
+
+    Input:
+        - result: ScanResult object
+        - target_labels: Short unit labels for the total table; the first is
+                         used for per-directory lines
+        - max_depth: Deepest directory level listed individually
+
+    Output: String containing per-directory lines and a total table
+    """
+    totals = result.totals()
+    content = []
+    if max_depth > 0:
+        label = target_labels[0]
+        for path in sorted(totals):
+            if result.depths[path] <= max_depth:
+                unit = generate_data_unit_list(
+                    DataUnit(totals[path], 'B'), [label])[0]
+                content.append('{v: >14} {ls: <3} {p}\n'.format(
+                    v=format_decimal_value(unit.value), ls=label, p=path))
+    base_unit = DataUnit(totals[result.root], 'B')
+    content.append('\nTotal: {p} ({d} directories, {f} files)\n{t}'.format(
+        p=result.root,
+        d=result.directories,
+        f=result.files,
+        t=format_table(generate_data_unit_list(base_unit, target_labels))))
+    if result.errors:
+        content.append('warning: {} directories could not be read\n'.format(
+            result.errors))
+    return ''.join(content)
+
+
+def parse_args(argv=None):
+    """ Parse scan subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc scan - sum file sizes in a directory tree'
+    parser = new_parser(prog='bitcalc scan', description=desc)
+
+    # Argument: path (positional, required)
+    help_str = 'specify directory to scan'
+    parser.add_argument('path', help=help_str)
+
+    # Argument: target_labels (positional, optional, multiple allowed)
+    help_str = 'specify target short unit label conversion target(s)'
+    help_str += '\n (default: all base-2 labels)'
+    parser.add_argument('target_labels', help=help_str, nargs='*')
+
+    # Argument: -d --max-depth (optional)
+    help_str = 'list directories down to this depth (default: 0, total only)'
+    parser.add_argument(
+        '-d', '--max-depth', help=help_str, type=int, default=0)
+
+    # Argument: -j --workers (optional)
+    help_str = 'specify number of scanning threads (default: 8)'
+    parser.add_argument('-j', '--workers', help=help_str, type=int, default=8)
+
+    # Argument: -p --progress (optional)
+    help_str = 'print progress to stderr while scanning'
+    parser.add_argument(
+        '-p', '--progress', help=help_str, action='store_true')
+
+    args = parser.parse_args(argv)
+    if not args.target_labels:
+        args.target_labels = LABELS_B2
+    validate_labels(args.target_labels)
+    if not os.path.isdir(args.path):
+        parser.error('not a directory: {}'.format(args.path))
+    if args.workers < 1:
+        parser.error('workers must be at least 1')
+    return args
+
+
+def main(argv=None):
+    """ Entry point for scan subcommand invocation """
+    args = parse_args(argv)
+    if args.progress:
+        with ScanProgress() as progress:
+            result = scan_tree(args.path, args.workers, progress)
+    else:
+        result = scan_tree(args.path, args.workers)
+    print(format_scan(result, args.target_labels, args.max_depth))
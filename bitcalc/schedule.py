@@ -0,0 +1,298 @@
+""" Event-driven simulation of many transfers sharing links
+
+Each job moves a size over one link. Jobs on a link share its capacity by
+weight (weighted fair share); a job with a higher priority takes the whole
+link until every higher priority job has finished (strict priority, fair
+share within a priority).
+
+Fair shares are never recomputed by stepping time. Every priority class
+keeps a virtual clock measuring service per unit of weight; a job's finish
+tag (virtual time at arrival plus size over weight) is fixed when it
+arrives, so each arrival or completion costs a few heap operations. Link
+completion predictions sit in one event heap and are invalidated lazily by
+a per-link version number when the set of active jobs changes.
+"""
+import heapq
+from array import array
+from collections import namedtuple
+from .bits import label_to_bits_factor
+from .planning import time_label_to_seconds
+from .time import Duration
+
+JobResult = namedtuple('JobResult', ['name', 'link', 'start', 'finish'])
+
+
+class _Class:
+    """ Jobs of one priority on one link """
+    __slots__ = ('virtual', 'weight', 'tags', 'waiting')
+
+    def __init__(self):
+        self.virtual = 0.0
+        self.weight = 0.0
+        self.tags = []
+        self.waiting = []
+
+
+class _Link:
+    """ Mutable simulation state of one link """
+    __slots__ = ('name', 'capacity', 'classes', 'active', 'updated',
+                 'version', 'busy_since', 'busy_periods')
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.classes = {}
+        self.active = None
+        self.updated = 0.0
+        self.version = 0
+        self.busy_since = None
+        self.busy_periods = []
+
+
+class Simulation:
+    """ Shared-link transfer scheduler; add links and jobs, then run() """
+    def __init__(self):
+        self.links = {}
+        self._job_links = []
+        self._job_bits = array('d')
+        self._job_weights = array('d')
+        self._job_priorities = []
+        self._job_releases = array('d')
+        self._job_names = []
+
+    def add_link(self, name, rate, rate_label=None, time_label_short='s'):
+        """ Add a link
+
+        Input:
+            - name: Link name referenced by jobs
+            - rate: Link capacity at rate_label per time_label_short, or a
+                    rate string such as '10Gbps' (see parsing.parse_rate)
+            - rate_label: Short unit label of rate (omitted for strings)
+            - time_label_short: Time label of rate (s, m, h, d, w, y)
+        """
+        if isinstance(rate, str):
+            from .parsing import parse_rate
+            rate_str = rate
+            rate, rate_label, time_label_short = parse_rate(rate_str)
+            if rate_label is None:
+                raise ValueError('Rate has no data label: {0}'.format(
+                    rate_str))
+        capacity = rate * label_to_bits_factor(rate_label) / \
+            time_label_to_seconds(time_label_short)
+        if capacity <= 0:
+            raise ValueError('Link rate must be positive')
+        self.links[name] = capacity
+
+    def add_job(self, size, size_label, link, weight=1, priority=0,
+                release=0.0, name=None, base=None):
+        """ Add a job
+
+        Input:
+            - size: Transfer size at size_label
+            - size_label: Short unit label of size
+            - link: Name of the link carrying the job
+            - weight: Share of the link relative to other jobs of the same
+                      priority
+            - priority: Higher priorities are served first
+            - release: Seconds after the simulation start the job arrives
+            - name: Optional job name (default: job index)
+            - base: Optional base for ambiguous size_label (b/B)
+        """
+        self.add_jobs([size], size_label, link, weight, priority, release,
+                      None if name is None else [name], base)
+
+    def add_jobs(self, sizes, size_label, link, weight=1, priority=0,
+                 release=0.0, names=None, base=None):
+        """ Add many jobs at once
+
+        Input:
+            - sizes: Iterable of transfer sizes at size_label
+            - size_label: Short unit label of sizes
+            - link, weight, priority, release: Scalars applied to every job,
+                    or sequences ordered as sizes (see add_job)
+            - names: Optional sequence of job names
+            - base: Optional base for ambiguous size_label (b/B)
+        """
+        factor = label_to_bits_factor(size_label, base=base)
+        first = len(self._job_bits)
+        self._job_bits.extend(size * factor for size in sizes)
+        count = len(self._job_bits) - first
+
+        def column(value):
+            if isinstance(value, (str, int, float)):
+                return [value] * count
+            value = list(value)
+            if len(value) != count:
+                raise ValueError('job attributes must match sizes')
+            return value
+        links = column(link)
+        for link_name in set(links):
+            if link_name not in self.links:
+                raise ValueError('Unknown link: {0}'.format(link_name))
+        weights = column(weight)
+        if min(weights, default=1) <= 0:
+            raise ValueError('Job weights must be positive')
+        self._job_links.extend(links)
+        self._job_weights.extend(weights)
+        self._job_priorities.extend(column(priority))
+        self._job_releases.extend(column(release))
+        self._job_names.extend(
+            range(first, first + count) if names is None else names)
+
+    def run(self):
+        """ Simulate every job to completion
+
+        Output: SimulationResult object
+        """
+        bits = self._job_bits
+        weights = self._job_weights
+        priorities = self._job_priorities
+        job_count = len(bits)
+        starts = array('d', bytes(8 * job_count))
+        finishes = array('d', bytes(8 * job_count))
+        links = {name: _Link(name, capacity)
+                 for name, capacity in self.links.items()}
+        job_links = [links[name] for name in self._job_links]
+        arrivals = sorted(range(job_count), key=self._job_releases.__getitem__)
+        events = []
+        push = heapq.heappush
+
+        def advance(link, now):
+            # Move the active class's virtual clock forward to now
+            if link.active is not None and now > link.updated:
+                active = link.classes[link.active]
+                active.virtual += (now - link.updated) * link.capacity / \
+                    active.weight
+            link.updated = now
+
+        def activate(link, now):
+            # Select the highest priority class with jobs and start its
+            # waiting jobs; predict the link's next completion
+            link.version += 1
+            link.active = max(link.classes) if link.classes else None
+            if link.active is None:
+                if link.busy_since is not None:
+                    link.busy_periods.append((link.busy_since, now))
+                    link.busy_since = None
+                return
+            if link.busy_since is None:
+                link.busy_since = now
+            active = link.classes[link.active]
+            for job in active.waiting:
+                starts[job] = now
+            active.waiting.clear()
+            finish = now + (active.tags[0][0] - active.virtual) * \
+                active.weight / link.capacity
+            push(events, (finish, link.version, link.name))
+
+        def complete(link, now):
+            # Remove the active class's jobs whose finish tag is reached
+            advance(link, now)
+            active = link.classes[link.active]
+            tag, job = heapq.heappop(active.tags)
+            # Pin the clock to the tag to stop rounding drift
+            active.virtual = tag
+            finishes[job] = now
+            active.weight -= weights[job]
+            while active.tags and active.tags[0][0] <= tag:
+                tag, job = heapq.heappop(active.tags)
+                finishes[job] = now
+                active.weight -= weights[job]
+            if not active.tags:
+                del link.classes[link.active]
+
+        def arrive(job, link, now):
+            advance(link, now)
+            priority = priorities[job]
+            job_class = link.classes.get(priority)
+            if job_class is None:
+                job_class = link.classes[priority] = _Class()
+            heapq.heappush(job_class.tags, (
+                job_class.virtual + bits[job] / weights[job], job))
+            job_class.weight += weights[job]
+            job_class.waiting.append(job)
+
+        releases = self._job_releases
+        position = 0
+        while True:
+            # Drop completion predictions made stale by later changes
+            while events and events[0][1] != links[events[0][2]].version:
+                heapq.heappop(events)
+            if not events and position == job_count:
+                break
+            now = min(
+                events[0][0] if events else float('inf'),
+                releases[arrivals[position]] if position < job_count
+                else float('inf'))
+
+            # Apply every completion and arrival at this instant before
+            # choosing active classes, so jobs only start once they get a
+            # share of the link
+            changed = {}
+            while events and events[0][0] <= now:
+                _, version, link_name = heapq.heappop(events)
+                link = links[link_name]
+                if version == link.version:
+                    complete(link, now)
+                    changed[link_name] = link
+            while position < job_count and \
+                    releases[arrivals[position]] <= now:
+                job = arrivals[position]
+                position += 1
+                link = job_links[job]
+                arrive(job, link, now)
+                changed[link.name] = link
+            for link in changed.values():
+                activate(link, now)
+
+        return SimulationResult(
+            self._job_names, self._job_links, starts, finishes,
+            {name: link.busy_periods for name, link in links.items()})
+
+
+class SimulationResult:
+    """ Per-job start/finish times and per-link busy periods """
+    def __init__(self, names, links, starts, finishes, busy_periods):
+        self.names = names
+        self.links = links
+        self.starts = starts
+        self.finishes = finishes
+        self.busy_periods = busy_periods
+
+    def __len__(self):
+        return len(self.starts)
+
+    def job(self, index):
+        """ Describe one job
+
+        Output: JobResult(name, link, start, finish) with start and finish
+                as Duration objects measured from the simulation start
+        """
+        return JobResult(
+            self.names[index], self.links[index],
+            Duration.from_seconds(self.starts[index]),
+            Duration.from_seconds(self.finishes[index]))
+
+    def jobs(self):
+        """ Describe every job in the order added (see job) """
+        for index in range(len(self.starts)):
+            yield self.job(index)
+
+    @property
+    def makespan(self):
+        """ Duration until the last job finished """
+        return Duration.from_seconds(max(self.finishes, default=0.0))
+
+    def utilization(self, until=None):
+        """ Fraction of time each link carried data
+
+        Input:
+            - until: Seconds of the observation window (default: makespan)
+
+        Output: Dictionary of link name: fraction between 0 and 1
+        """
+        until = self.makespan.seconds if until is None else until
+        return {
+            name: sum(min(end, until) - start for start, end in periods
+                      if start < until) / until if until else 0.0
+            for name, periods in self.busy_periods.items()}
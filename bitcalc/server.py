@@ -0,0 +1,253 @@
+""" Long running conversion daemon (see bitcalc.client for the client)
+
+The daemon listens on a Unix domain socket (or TCP loopback) and answers
+newline delimited requests, so callers avoid interpreter start up per
+conversion. Connections are served concurrently and requests on a single
+connection may be pipelined; responses are written in request order.
+
+Request formats (one per line):
+    - Plain text: "value label target_label [target_label ...]"
+      Response: tab delimited "value label" pairs, as in stream mode
+    - JSON: {"value": 5, "label": "GiB", "targets": ["MiB"], "base": 2}
+      Response: {"values": {"MiB": 5120.0}}
+    - JSON: {"argv": ["5", "TiB", "MiB", "--rate", "37/s"]}
+      Response: {"status": 0, "output": "..."} (full command line output)
+JSON requests may carry an "id" which is echoed in the response. Failures
+are reported as "error: ..." (plain text) or {"error": "..."} (JSON).
+"""
+import asyncio
+import io
+import ipaddress
+import json
+import os
+import signal
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from .bits import convert
+from .client import (SOCKET_ENV, connect, default_socket_path,
+                     parse_tcp_address)
+from .interface import (SUBCOMMANDS, PROFILE_OPTIONS_PREFIX, new_parser,
+                        format_decimal_value)
+
+
+def is_loopback(host):
+    """ Identify whether host is a loopback address (or localhost) """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def run_cli(argv):
+    """ Run the command line interface in-process and capture its output
+
+    Input:
+        - argv: List of argument strings
+
+    Output: Tuple of (exit status, output string)
+    """
+    from .interface import main
+    if any(arg.startswith(PROFILE_OPTIONS_PREFIX) for arg in argv):
+        # Profiling would write files and re-enter main with any argv
+        return 2, 'error: profiling is not served\n'
+    if argv and (argv[0] in SUBCOMMANDS or '--stream' in argv):
+        return 2, 'error: subcommands and stream mode are not served\n'
+    output = io.StringIO()
+    status = 0
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            main(argv)
+        except SystemExit as exc:
+            status = exc.code if isinstance(exc.code, int) else 1
+            if isinstance(exc.code, str):
+                # The interpreter would print this message on exit
+                output.write(exc.code + '\n')
+        except Exception as exc:
+            # A failing command must not take the connection down with it
+            status = 1
+            output.write('error: {}: {}\n'.format(
+                type(exc).__name__, exc))
+    return status, output.getvalue()
+
+
+def handle_text_request(line):
+    """ Answer a plain text "value label target..." request
+
+    Output: Response line (without trailing newline)
+    """
+    fields = line.split()
+    if len(fields) < 3:
+        return 'error: expected "value label target_label..."'
+    try:
+        values = convert(float(fields[0]), fields[1], fields[2:])
+    except ValueError as exc:
+        return 'error: {}'.format(exc)
+    return '\t'.join(
+        '{} {}'.format(format_decimal_value(value), label)
+        for value, label in zip(values, fields[2:]))
+
+
+def handle_json_request(line):
+    """ Answer a JSON request
+
+    Output: Response line (without trailing newline)
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as exc:
+        return json.dumps({'error': 'invalid JSON: {}'.format(exc)})
+    if not isinstance(request, dict):
+        return json.dumps({'error': 'request must be a JSON object'})
+
+    try:
+        if 'argv' in request:
+            status, output = run_cli([str(arg) for arg in request['argv']])
+            response = {'status': status, 'output': output}
+        else:
+            targets = request['targets']
+            values = convert(
+                request['value'], request['label'], targets,
+                base=request.get('base'))
+            response = {'values': dict(zip(targets, values))}
+    except KeyError as exc:
+        response = {'error': 'missing field: {}'.format(exc)}
+    except (ValueError, TypeError) as exc:
+        response = {'error': str(exc)}
+    if 'id' in request:
+        response['id'] = request['id']
+    return json.dumps(response)
+
+
+def handle_request(line):
+    """ Dispatch a request line to the text or JSON handler """
+    line = line.strip()
+    try:
+        if line.startswith('{'):
+            return handle_json_request(line)
+        return handle_text_request(line)
+    except Exception as exc:
+        # Answer unexpected failures so later pipelined requests still are
+        message = 'internal error: {}: {}'.format(type(exc).__name__, exc)
+        if line.startswith('{'):
+            return json.dumps({'error': message})
+        return 'error: {}'.format(message)
+
+
+async def serve_connection(reader, writer):
+    """ Answer pipelined requests on one connection until it closes """
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                # Line exceeds the stream limit; later requests cannot be
+                # framed, so answer once and drop the connection
+                writer.write(b'error: request line too long\n')
+                await writer.drain()
+                break
+            if not line:
+                break
+            if not line.strip():
+                continue
+            response = handle_request(line.decode('utf-8', 'replace'))
+            writer.write(response.encode('utf-8') + b'\n')
+            # Let the transport apply back pressure for slow readers
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(socket_path=None, tcp_address=None):
+    """ Start listening on a Unix domain socket or TCP address
+
+    Input:
+        - socket_path: Unix domain socket path (default when no tcp_address)
+        - tcp_address: Optional (host, port) tuple
+
+    Output: asyncio Server object
+    """
+    if tcp_address:
+        host, port = tcp_address
+        if not is_loopback(host):
+            raise ValueError('not a loopback address: {}'.format(host))
+        return await asyncio.start_server(serve_connection, host, port)
+    if os.path.exists(socket_path):
+        try:
+            connect(socket_path, timeout=1.0).close()
+        except OSError:
+            # Remove a stale socket left behind by a previous daemon
+            os.unlink(socket_path)
+        else:
+            raise OSError('daemon already listening on {}'.format(
+                socket_path))
+    return await asyncio.start_unix_server(serve_connection, socket_path)
+
+
+async def serve(socket_path=None, tcp_address=None):
+    """ Run the daemon until SIGTERM or SIGINT is received """
+    server = await start_server(socket_path, tcp_address)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        if not tcp_address and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def parse_args(argv=None):
+    """ Parse serve subcommand arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc serve - answer conversion requests over a local socket'
+    epilog = 'request formats (one per line):'
+    epilog += '\n  value label target_label [target_label ...]'
+    epilog += '\n  {"value": 5, "label": "GiB", "targets": ["MiB"]}'
+    epilog += '\n  {"argv": ["5", "TiB", "MiB", "--rate", "37/s"]}'
+    epilog += '\n\nforward command lines with: bitcalc client ARGS'
+    parser = new_parser(
+        prog='bitcalc serve', description=desc, epilog=epilog)
+
+    # Argument: -s --socket (optional)
+    help_str = 'specify Unix domain socket path'
+    help_str += '\n (default: ${} or {})'.format(
+        SOCKET_ENV, default_socket_path())
+    parser.add_argument(
+        '-s', '--socket', help=help_str,
+        default=os.environ.get(SOCKET_ENV) or default_socket_path())
+
+    # Argument: -t --tcp (optional)
+    help_str = 'listen on loopback TCP host:port instead '
+    help_str += '(e.g.: 127.0.0.1:8990)'
+    parser.add_argument('-t', '--tcp', help=help_str)
+
+    args = parser.parse_args(argv)
+    if args.tcp:
+        try:
+            args.tcp = parse_tcp_address(args.tcp)
+        except ValueError:
+            parser.error('invalid TCP address: {}'.format(args.tcp))
+        if not is_loopback(args.tcp[0]):
+            parser.error('TCP address must be loopback: {}'.format(
+                args.tcp[0]))
+    return args
+
+
+def main(argv=None):
+    """ Entry point for serve subcommand invocation """
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args.socket, args.tcp))
+    except OSError as exc:
+        sys.exit('error: {}'.format(exc))
@@ -0,0 +1,238 @@
+import os
+import sys
+from collections import deque
+from .bits import label_to_bits_factor
+from .interface import (LABELS_B2, LABELS_B10, new_parser, validate_labels,
+                        format_decimal_value)
+
+# Default number of input lines handed to a worker process at a time
+DEFAULT_CHUNK_SIZE = 10000
+
+# Chunks queued per worker process before output is written
+CHUNKS_PER_JOB = 2
+
+
+def parse_args(argv=None):
+    """ Parse stream mode arguments provided by user
+
+    Input:
+        - argv: Optional list of argument strings (defaults to sys.argv)
+
+    Output: Namespace object containing validated argument values
+    """
+    desc = 'Bitcalc stream mode - convert newline delimited "value label" '
+    desc += 'records read from stdin or a file'
+    parser = new_parser(prog='bitcalc --stream', description=desc)
+
+    # Argument: --stream (switch that selects this parser)
+    help_str = 'read records from input instead of positional arguments'
+    parser.add_argument('--stream', help=help_str, action='store_true')
+
+    # Argument: target_labels (positional, required, multiple allowed)
+    help_str = 'specify target short unit label conversion target(s)'
+    parser.add_argument('target_labels', help=help_str, nargs='+')
+
+    # Argument: -f --file (optional)
+    help_str = 'specify file to read records from (default: stdin)'
+    parser.add_argument('-f', '--file', help=help_str, default='-')
+
+    # Argument: -b --base (optional, only effective for b/B)
+    help_str = 'specify base for ambiguous unit labels in records'
+    parser.add_argument(
+        '-b', '--base',
+        help=help_str,
+        type=int,
+        choices=[2, 10])
+
+    # Argument: -j --jobs (optional)
+    help_str = 'specify number of worker processes (default: 1, no pool)'
+    parser.add_argument('-j', '--jobs', help=help_str, type=int, default=1)
+
+    # Argument: -c --chunk-size (optional)
+    help_str = 'specify records per worker chunk (default: {})'.format(
+        DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        '-c', '--chunk-size', help=help_str, type=int,
+        default=DEFAULT_CHUNK_SIZE)
+
+    args = parser.parse_args(argv)
+    validate_labels(args.target_labels)
+    if args.jobs < 1:
+        parser.error('jobs must be at least 1')
+    if args.chunk_size < 1:
+        parser.error('chunk size must be at least 1')
+    return args
+
+
+def read_records(lines, start=1):
+    """ Split lines into (line number, count, label) records lazily
+
+    Input:
+        - lines: Iterable of strings formatted as "value label"
+        - start: Line number of the first line (used in error reports)
+
+    Output: Generator of (line_number, count, label) tuples; malformed lines
+            are reported to stderr and skipped
+    """
+    valid_labels = set(LABELS_B2) | set(LABELS_B10)
+    for line_number, line in enumerate(lines, start):
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            count_str, label = fields
+            count = float(count_str)
+        except ValueError:
+            sys.stderr.write('line {0}: invalid record: {1}\n'.format(
+                line_number, line.rstrip('\n')))
+            continue
+        if label not in valid_labels:
+            sys.stderr.write('line {0}: invalid label: {1}\n'.format(
+                line_number, label))
+            continue
+        yield line_number, count, label
+
+
+def convert_records(records, target_labels, base=None):
+    """ Convert records to each target label lazily
+
+    Conversion factors are resolved once per label and reused for the
+    lifetime of the generator.
+
+    Input:
+        - records: Iterable of (line_number, count, label) tuples
+        - target_labels: Short unit labels to convert each record to
+        - base: Optional base for ambiguous record labels (b/B)
+
+    Output: Generator of lists of (value, target_label) tuples
+    """
+    target_factors = [
+        (label, label_to_bits_factor(label)) for label in target_labels]
+    input_factors = {}
+    for line_number, count, label in records:
+        if label not in input_factors:
+            input_factors[label] = label_to_bits_factor(label, base=base)
+        bits = count * input_factors[label]
+        yield [(bits / factor, target_label)
+               for target_label, factor in target_factors]
+
+
+def format_records(converted):
+    """ Format converted records as tab delimited output lines
+
+    Input:
+        - converted: Iterable of lists of (value, label) tuples
+
+    Output: Generator of output line strings
+    """
+    for values in converted:
+        yield '{}\n'.format('\t'.join(
+            '{} {}'.format(format_decimal_value(value), label)
+            for value, label in values))
+
+
+def convert_stream(input_file, output_file, target_labels, base=None):
+    """ Convert every record in input_file and write results incrementally
+
+    Input:
+        - input_file: File object to read "value label" records from
+        - output_file: File object to write converted records to
+        - target_labels: Short unit labels to convert each record to
+        - base: Optional base for ambiguous record labels (b/B)
+    """
+    records = read_records(input_file)
+    converted = convert_records(records, target_labels, base=base)
+    for line in format_records(converted):
+        output_file.write(line)
+
+
+def iter_line_chunks(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Group lines into consecutive chunks
+
+    Input:
+        - lines: Iterable of strings
+        - chunk_size: Maximum number of lines per chunk
+
+    Output: Generator of (first line number, list of lines) tuples
+    """
+    chunk = []
+    start = 1
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield start, chunk
+            start += chunk_size
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def convert_chunk(start, lines, target_labels, base=None):
+    """ Convert a chunk of lines to output text (runs in worker processes)
+
+    Input:
+        - start: Line number of the first line in lines
+        - lines: List of strings formatted as "value label"
+        - target_labels: Short unit labels to convert each record to
+        - base: Optional base for ambiguous record labels (b/B)
+
+    Output: String containing the converted output lines
+    """
+    records = read_records(lines, start)
+    converted = convert_records(records, target_labels, base=base)
+    return ''.join(format_records(converted))
+
+
+def convert_stream_parallel(input_file, output_file, target_labels, base=None,
+                            jobs=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Convert records on a process pool, writing output in input order
+
+    Input is read lazily in chunks of chunk_size lines; at most
+    CHUNKS_PER_JOB chunks per worker are in flight, so memory use is bounded
+    regardless of input length.
+
+    Input:
+        - input_file: File object to read "value label" records from
+        - output_file: File object to write converted records to
+        - target_labels: Short unit labels to convert each record to
+        - base: Optional base for ambiguous record labels (b/B)
+        - jobs: Number of worker processes (default: CPU count)
+        - chunk_size: Number of lines per worker task
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    jobs = jobs or os.cpu_count() or 1
+    target_labels = list(target_labels)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for start, lines in iter_line_chunks(input_file, chunk_size):
+            pending.append(executor.submit(
+                convert_chunk, start, lines, target_labels, base))
+            if len(pending) >= jobs * CHUNKS_PER_JOB:
+                output_file.write(pending.popleft().result())
+        while pending:
+            output_file.write(pending.popleft().result())
+
+
+def main(argv=None):
+    """ Entry point for stream mode command line invocation """
+    args = parse_args(argv)
+    if args.jobs > 1:
+        def convert(input_file):
+            convert_stream_parallel(
+                input_file, sys.stdout, args.target_labels, base=args.base,
+                jobs=args.jobs, chunk_size=args.chunk_size)
+    else:
+        def convert(input_file):
+            convert_stream(input_file, sys.stdout, args.target_labels,
+                           base=args.base)
+    try:
+        if args.file == '-':
+            convert(sys.stdin)
+        else:
+            with open(args.file) as input_file:
+                convert(input_file)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Downstream reader exited (e.g.: head); silence the final flush
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
@@ -0,0 +1,151 @@
+""" Size tier classification against mixed-unit boundaries
+
+A rule set such as "<512 MiB hot, <2 TB warm, else cold" is compiled once
+into a sorted tuple of boundaries in bits. Sizes in any label are then
+classified by binary search (numpy.searchsorted over whole arrays when NumPy
+is installed, bisect otherwise), and per-tier counts and totals are
+gathered in the same pass.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from .bits import DataUnit, label_to_bits_factor
+from .compat import get_numpy
+from .parsing import parse_quantity
+
+TierTotal = namedtuple('TierTotal', ['name', 'count', 'bits'])
+
+
+class TierIndex:
+    """ Sorted, bit-normalized tier boundaries
+
+    Each rule (name, boundary) matches sizes below boundary that no smaller
+    boundary matched; sizes at or above every boundary fall into default.
+
+    Input:
+        - rules: Iterable of (tier name, boundary) tuples; boundaries are
+                 DataUnit objects, (value, label) tuples or size strings
+                 such as '512 MiB'
+        - default: Tier name for sizes at or above every boundary
+        - base: Optional base for ambiguous boundary labels (b/B)
+    """
+    def __init__(self, rules, default='default', base=None):
+        bounded = sorted(
+            (self._to_bits(boundary, base), name) for name, boundary in rules)
+        boundaries = tuple(bits for bits, _ in bounded)
+        if len(set(boundaries)) != len(boundaries):
+            raise ValueError('Tier boundaries must be distinct')
+        self.boundaries = boundaries
+        self.names = tuple(name for _, name in bounded) + (default,)
+
+    @staticmethod
+    def _to_bits(boundary, base=None):
+        if isinstance(boundary, DataUnit):
+            return boundary.bits
+        if isinstance(boundary, str):
+            boundary = parse_quantity(boundary)
+        value, label_short = boundary
+        return value * label_to_bits_factor(label_short, base=base)
+
+    @classmethod
+    def from_string(cls, rules, base=None):
+        """ Compile a rule string such as "<512 MiB hot, <2 TB warm, else cold"
+
+        Input:
+            - rules: Comma separated "<size name" rules, optionally ending in
+                     "else name" (default tier name: 'default')
+            - base: Optional base for ambiguous boundary labels (b/B)
+
+        Output: New TierIndex object
+        """
+        parsed = []
+        default = 'default'
+        for rule in rules.split(','):
+            rule = rule.strip()
+            if rule.startswith('else '):
+                default = rule[5:].strip()
+                continue
+            size, _, name = rule.lstrip('<').rpartition(' ')
+            if not rule.startswith('<') or not size or not name:
+                raise ValueError('Invalid tier rule: {0}'.format(rule))
+            parsed.append((name, size))
+        return cls(parsed, default=default, base=base)
+
+    def index(self, value, label_short='B', base=None):
+        """ Identify the tier index of a single size """
+        bits = value * label_to_bits_factor(label_short, base=base)
+        return bisect_right(self.boundaries, bits)
+
+    def classify(self, value, label_short='B', base=None):
+        """ Identify the tier name of a single size
+
+        Input:
+            - value: Size at label_short
+            - label_short: Short unit label of value
+            - base: Optional base for ambiguous label_short (b/B)
+
+        Output: Tier name
+        """
+        return self.names[self.index(value, label_short, base)]
+
+    def classify_many(self, values, label_short='B', base=None):
+        """ Identify the tier index of many sizes
+
+        Input:
+            - values: NumPy array, buffer or iterable of sizes at label_short
+            - label_short: Short unit label of values
+            - base: Optional base for ambiguous label_short (b/B)
+
+        Output: NumPy integer array or array('B') of indexes into names
+        """
+        factor = label_to_bits_factor(label_short, base=base)
+        np = get_numpy()
+        if np is not None:
+            bits = np.asarray(values, dtype=np.float64) * factor
+            return np.searchsorted(self.boundaries, bits, side='right')
+        from array import array
+        boundaries = self.boundaries
+        return array('B' if len(self.names) < 256 else 'I', [
+            bisect_right(boundaries, value * factor) for value in values])
+
+    def summarize(self, values, label_short='B', base=None):
+        """ Count and total sizes per tier in one pass
+
+        Input:
+            - values: NumPy array, buffer or iterable of sizes at label_short
+            - label_short: Short unit label of values
+            - base: Optional base for ambiguous label_short (b/B)
+
+        Output: List of TierTotal(name, count, bits), ordered as names
+        """
+        factor = label_to_bits_factor(label_short, base=base)
+        tiers = len(self.names)
+        np = get_numpy()
+        if np is not None:
+            bits = np.asarray(values, dtype=np.float64) * factor
+            indexes = np.searchsorted(self.boundaries, bits, side='right')
+            counts = np.bincount(indexes, minlength=tiers).tolist()
+            totals = np.bincount(
+                indexes, weights=bits, minlength=tiers).tolist()
+        else:
+            boundaries = self.boundaries
+            counts = [0] * tiers
+            totals = [0] * tiers
+            for value in values:
+                bits = value * factor
+                index = bisect_right(boundaries, bits)
+                counts[index] += 1
+                totals[index] += bits
+        return [TierTotal(*tier) for tier in zip(self.names, counts, totals)]
+
+    def report(self, values, target_label, label_short='B', base=None):
+        """ Summarize sizes per tier as DataUnit totals at target_label
+
+        Output: Tuple of (row label list, DataUnit list) for format_table;
+                row labels carry the tier name and count
+        """
+        row_labels = []
+        units = []
+        for tier in self.summarize(values, label_short, base):
+            row_labels.append('{} ({})'.format(tier.name, tier.count))
+            units.append(DataUnit.from_bits(tier.bits, target_label))
+        return row_labels, units
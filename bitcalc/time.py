@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from datetime import timedelta
+from operator import mul
 
 TIME_UNITS_TO_SECONDS = OrderedDict([
     ('seconds', 1),
@@ -25,18 +25,70 @@ def scale_rate_to_seconds(rate_value, time_label_short):
     return rate_value / TIME_UNITS_TO_SECONDS[time_label_long]
 
 
+# Seconds per field of a y:w:d:h:m:s timestamp, keyed by field count
+_FIELD_SECONDS = {
+    count: tuple(reversed(list(TIME_UNITS_TO_SECONDS.values())[:count]))
+    for count in range(1, len(TIME_UNITS_TO_SECONDS) + 1)}
+
+
 class Duration:
-    def __init__(self, timestamp=None, delta=None):
-        if delta:
-            timestamp = self.delta_to_timestamp(delta)
+    """ Length of time, stored as seconds
 
-        self.seconds = self.timestamp_to_seconds(timestamp)
-        self.minutes = self.seconds / TIME_UNITS_TO_SECONDS['minutes']
-        self.hours = self.seconds / TIME_UNITS_TO_SECONDS['hours']
-        self.days = self.seconds / TIME_UNITS_TO_SECONDS['days']
-        self.weeks = self.seconds / TIME_UNITS_TO_SECONDS['weeks']
-        self.years = self.seconds / TIME_UNITS_TO_SECONDS['years']
-        self.delta = timedelta(seconds=self.seconds)
+    Unit fields (minutes, hours, ...) and delta are derived on access, so
+    constructing a Duration costs a single attribute assignment.
+    """
+    __slots__ = ('seconds', '_delta')
+
+    def __init__(self, timestamp=None, delta=None):
+        if delta is not None:
+            # Whole seconds, matching the y:w:d:h:m:s timestamp resolution
+            self.seconds = (delta.days * TIME_UNITS_TO_SECONDS['days']
+                            + delta.seconds)
+        else:
+            self.seconds = self.timestamp_to_seconds(timestamp)
+        self._delta = None
+
+    @classmethod
+    def from_seconds(cls, seconds):
+        """ Instantiate from a number of seconds (int or float) """
+        duration = cls.__new__(cls)
+        duration.seconds = seconds
+        duration._delta = None
+        return duration
+
+    @classmethod
+    def from_timedelta(cls, delta):
+        """ Instantiate from a timedelta, keeping sub-second precision """
+        duration = cls.from_seconds(delta.total_seconds())
+        duration._delta = delta
+        return duration
+
+    @property
+    def minutes(self):
+        return self.seconds / TIME_UNITS_TO_SECONDS['minutes']
+
+    @property
+    def hours(self):
+        return self.seconds / TIME_UNITS_TO_SECONDS['hours']
+
+    @property
+    def days(self):
+        return self.seconds / TIME_UNITS_TO_SECONDS['days']
+
+    @property
+    def weeks(self):
+        return self.seconds / TIME_UNITS_TO_SECONDS['weeks']
+
+    @property
+    def years(self):
+        return self.seconds / TIME_UNITS_TO_SECONDS['years']
+
+    @property
+    def delta(self):
+        if self._delta is None:
+            from datetime import timedelta
+            self._delta = timedelta(seconds=self.seconds)
+        return self._delta
 
     @staticmethod
     def timestamp_to_units_list(timestamp):
@@ -61,13 +113,7 @@ class Duration:
 
         Output: Dictionary of unit: value representing input timestamp
         """
-        time_units_dict = {}
-        for label in TIME_UNITS_TO_SECONDS:
-            if time_units:
-                # Save last value in list with current label as key
-                time_units_dict[label] = time_units.pop()
-
-        return time_units_dict
+        return dict(zip(TIME_UNITS_TO_SECONDS, reversed(time_units)))
 
     @staticmethod
     def units_to_seconds(time_units_dict):
@@ -93,9 +139,28 @@ class Duration:
 
         Output: Sum of seconds (int)
         """
-        units_list = Duration.timestamp_to_units_list(timestamp)
-        units_dict = Duration.units_to_dict(units_list)
-        return Duration.units_to_seconds(units_dict)
+        # Fields beyond the six known units are ignored, as before
+        fields = timestamp.split(':')[-6:]
+        return sum(map(mul, map(int, fields), _FIELD_SECONDS[len(fields)]))
+
+    @staticmethod
+    def timestamps_to_seconds(timestamps):
+        """ Process many timestamp strings to sums of seconds
+
+        Input:
+            - timestamps: Iterable of y:w:d:h:m:s timestamp strings
+
+        Output: array('q') of seconds, ordered as timestamps
+        """
+        from array import array
+        field_seconds = _FIELD_SECONDS
+        seconds = array('q')
+        append = seconds.append
+        for timestamp in timestamps:
+            fields = timestamp.split(':')[-6:]
+            append(sum(map(mul, map(int, fields),
+                           field_seconds[len(fields)])))
+        return seconds
 
     @staticmethod
     def delta_to_timestamp(delta):
@@ -0,0 +1,195 @@
+""" Transfer time model accounting for protocol overhead and concurrency
+
+DataRate divides size by rate. TransferModel refines that estimate with:
+    - framing overhead of the protocol stack (e.g.: TCP/IPv4 over Ethernet
+      with a given MTU), so only payload bytes count as progress
+    - N parallel streams, each optionally capped at a per-stream rate
+    - an overall throttle
+    - a fixed latency per file (handshakes, metadata), spread over streams
+    - a compression ratio applied to data before it is sent
+
+Single estimates return DataRate objects; estimate_many solves many jobs at
+once over arrays (see bitcalc.planning for array handling).
+"""
+from .bits import DataRate, label_to_bits_factor
+from .planning import (as_values, combine, time_label_to_seconds,
+                       to_timedeltas)
+
+# Bytes added per frame on the wire by Ethernet (header 14, FCS 4,
+# preamble 8, interframe gap 12)
+ETHERNET_FRAMING_BYTES = 38
+
+# Header bytes per packet of each protocol layer
+HEADER_BYTES = {
+    'ipv4': 20,
+    'ipv6': 40,
+    'tcp': 20,
+    'tcp-timestamps': 32,
+    'udp': 8,
+}
+
+# Protocol stack presets: name to header layers inside each frame
+PROTOCOLS = {
+    'none': (),
+    'tcp': ('ipv4', 'tcp'),
+    'tcp-timestamps': ('ipv4', 'tcp-timestamps'),
+    'tcp6': ('ipv6', 'tcp'),
+    'udp': ('ipv4', 'udp'),
+    'udp6': ('ipv6', 'udp'),
+}
+
+# Default Ethernet MTU (bytes)
+DEFAULT_MTU = 1500
+
+
+def framing_efficiency(protocol='tcp', mtu=DEFAULT_MTU,
+                       link_framing=ETHERNET_FRAMING_BYTES):
+    """ Calculate the fraction of link capacity carrying payload
+
+    Input:
+        - protocol: Key of PROTOCOLS ('none' disables overhead)
+        - mtu: Maximum transmission unit in bytes
+        - link_framing: Bytes added per frame by the link layer
+
+    Output: Float between 0 and 1
+    """
+    if protocol not in PROTOCOLS:
+        raise ValueError('Invalid protocol: {0}'.format(protocol))
+    if protocol == 'none':
+        return 1.0
+    payload = mtu - sum(HEADER_BYTES[layer] for layer in PROTOCOLS[protocol])
+    if payload <= 0:
+        raise ValueError('MTU {0} leaves no room for payload'.format(mtu))
+    return payload / (mtu + link_framing)
+
+
+class TransferModel:
+    """ Model of a transfer link; see module documentation
+
+    Rates (rate, stream_rate, throttle) are given at rate_label per
+    time_label_short; per_file_latency is in seconds.
+    """
+    def __init__(self, rate, rate_label, time_label_short='s', protocol='tcp',
+                 mtu=DEFAULT_MTU, streams=1, stream_rate=None, throttle=None,
+                 per_file_latency=0.0, compression_ratio=1.0):
+        if streams < 1:
+            raise ValueError('streams must be at least 1')
+        if compression_ratio <= 0:
+            raise ValueError('compression_ratio must be positive')
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if stream_rate is not None and stream_rate <= 0:
+            raise ValueError('stream_rate must be positive')
+        if throttle is not None and throttle <= 0:
+            raise ValueError('throttle must be positive')
+        self.rate = rate
+        self.rate_label = rate_label
+        self.time_label_short = time_label_short
+        self.protocol = protocol
+        self.mtu = mtu
+        self.streams = streams
+        self.stream_rate = stream_rate
+        self.throttle = throttle
+        self.per_file_latency = per_file_latency
+        self.compression_ratio = compression_ratio
+        self.efficiency = framing_efficiency(protocol, mtu)
+        self.bits_per_second = self._goodput()
+
+    @classmethod
+    def from_rate_string(cls, rate_str, **kwargs):
+        """ Instantiate from a rate string such as '10Gbps' or '37 MiB/s'
+
+        Input:
+            - rate_str: Rate string with a data label (see parsing.parse_rate)
+            - kwargs: Remaining TransferModel arguments
+
+        Output: New TransferModel object
+        """
+        from .parsing import parse_rate
+        rate, label, time_label_short = parse_rate(rate_str)
+        if label is None:
+            raise ValueError('Rate has no data label: {0}'.format(rate_str))
+        return cls(rate, label, time_label_short, **kwargs)
+
+    def _to_bits_per_second(self, rate):
+        return (rate * label_to_bits_factor(self.rate_label)
+                / time_label_to_seconds(self.time_label_short))
+
+    def _goodput(self):
+        """ Payload bits per second across all streams """
+        bits_per_second = self._to_bits_per_second(self.rate) * self.efficiency
+        if self.stream_rate is not None:
+            # Per-stream caps apply to payload already on the wire
+            bits_per_second = min(
+                bits_per_second,
+                self._to_bits_per_second(self.stream_rate) * self.streams)
+        if self.throttle is not None:
+            bits_per_second = min(
+                bits_per_second, self._to_bits_per_second(self.throttle))
+        return bits_per_second
+
+    def seconds(self, size, size_label, files=1, base=None):
+        """ Estimate seconds needed to transfer size split into files
+
+        Input:
+            - size: Transfer size at size_label
+            - size_label: Short unit label of size
+            - files: Number of files the size is spread over
+            - base: Optional base for ambiguous size_label (b/B)
+
+        Output: Float seconds
+        """
+        bits = size * label_to_bits_factor(size_label, base=base)
+        return (bits / self.compression_ratio / self.bits_per_second
+                + self._latency_seconds(files))
+
+    def _latency_seconds(self, files):
+        # Files are spread evenly over streams; each stream pays the latency
+        # once per file it carries
+        rounds = -(-files // self.streams)
+        return rounds * self.per_file_latency
+
+    def estimate(self, unit, files=1):
+        """ Estimate transfer of a DataUnit
+
+        Input:
+            - unit: DataUnit object describing the transfer size
+            - files: Number of files the size is spread over
+
+        Output: DataRate object at unit's label whose rate is the effective
+                (end to end) rate and whose duration includes all overhead;
+                zero rate and duration for zero-size units
+        """
+        if not unit.bits:
+            return DataRate.from_rate(
+                unit, 0, 0, time_label_short=self.time_label_short)
+        seconds = self.seconds(unit.bits, 'b', files)
+        time_seconds = time_label_to_seconds(self.time_label_short)
+        return DataRate(
+            unit, rate=unit.value / seconds * time_seconds,
+            time_label_short=self.time_label_short)
+
+    def estimate_many(self, sizes, size_label, files=1, as_timedelta=False,
+                      base=None):
+        """ Estimate transfer seconds for many jobs
+
+        Input:
+            - sizes: Transfer sizes at size_label (scalar or array)
+            - size_label: Short unit label of sizes
+            - files: File counts per job (scalar or array; broadcast against
+                     sizes)
+            - as_timedelta: Return timedelta objects instead of seconds
+            - base: Optional base for ambiguous size_label (b/B)
+
+        Output: Array of durations in seconds, or list of timedelta objects
+        """
+        scale = (label_to_bits_factor(size_label, base=base)
+                 / self.compression_ratio / self.bits_per_second)
+        streams = self.streams
+        latency = self.per_file_latency
+
+        def solve(size, count):
+            # -(-a // b) is ceiling division for floats and NumPy arrays
+            return size * scale + -(-count // streams) * latency
+        seconds = combine(as_values(sizes), as_values(files), solve)
+        return to_timedeltas(seconds) if as_timedelta else seconds
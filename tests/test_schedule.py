@@ -0,0 +1,35 @@
+import unittest
+from bitcalc.schedule import Simulation
+
+
+class SimultaneousArrivalTest(unittest.TestCase):
+    def run_jobs(self, jobs):
+        simulation = Simulation()
+        simulation.add_link('wan', 1, 'MB')
+        for size, priority, release in jobs:
+            simulation.add_job(size, 'MB', 'wan', priority=priority,
+                               release=release)
+        return simulation.run()
+
+    def test_lower_priority_starts_after_higher_priority(self):
+        # The low priority job is added first but gets no share until the
+        # high priority job arriving at the same instant has finished
+        result = self.run_jobs([(10, 0, 0), (30, 1, 0)])
+        self.assertEqual(list(result.starts), [30.0, 0.0])
+        self.assertEqual(list(result.finishes), [40.0, 30.0])
+
+    def test_arrival_at_completion_instant(self):
+        # A high priority job arriving as another job finishes preempts the
+        # waiting low priority job before it is served
+        result = self.run_jobs([(10, 1, 0), (10, 0, 10), (20, 2, 10)])
+        self.assertEqual(list(result.starts), [0.0, 30.0, 10.0])
+        self.assertEqual(list(result.finishes), [10.0, 40.0, 30.0])
+
+    def test_equal_priority_share_from_arrival(self):
+        result = self.run_jobs([(10, 0, 0), (10, 0, 0), (10, 0, 5)])
+        self.assertEqual(list(result.starts), [0.0, 0.0, 5.0])
+        self.assertEqual(result.makespan.seconds, 30.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
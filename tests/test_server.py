@@ -0,0 +1,36 @@
+import asyncio
+import json
+import unittest
+from bitcalc.server import start_server
+
+
+class FailingRequestTest(unittest.TestCase):
+    def exchange(self, requests):
+        async def run():
+            server = await start_server(tcp_address=('127.0.0.1', 0))
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(''.join(
+                request + '\n' for request in requests).encode('utf-8'))
+            await writer.drain()
+            responses = [
+                (await reader.readline()).decode('utf-8')
+                for _ in requests]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+        return asyncio.run(run())
+
+    def test_failing_command_keeps_connection_open(self):
+        # A duration of zero divides by zero inside interface.main
+        failing = json.dumps({'argv': ['1', 'TB', 'GiB', '-d', '0']})
+        responses = self.exchange([failing, '5 GiB MiB'])
+        response = json.loads(responses[0])
+        self.assertNotEqual(response['status'], 0)
+        self.assertIn('error', response['output'])
+        self.assertEqual(responses[1], '5120 MiB\n')
+
+
+if __name__ == '__main__':
+    unittest.main()